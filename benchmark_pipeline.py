@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+from datetime import datetime
+
+import satellite_ids
+import ground_station_dashboard as ground
+from iot_sensor import VirtualSensor, create_sensor_data, build_message
+
+# Banc de test de bout en bout : capteurs -> satellite (IDS) -> station sol -> SQLite, sur localhost
+BENCH_IP = "127.0.0.1"
+HOPS = ["sensor_to_satellite", "satellite", "uplink", "ground", "persist", "end_to_end"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((BENCH_IP, 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((BENCH_IP, port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class HopTracker:
+    """Horodatage de chaque message à chaque étage, clé (sensor_id, timestamp)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.marks = {}
+
+    def mark(self, key, stage):
+        now = time.perf_counter()
+        with self.lock:
+            self.marks.setdefault(key, {}).setdefault(stage, now)
+
+    def count(self, stage):
+        with self.lock:
+            return sum(1 for m in self.marks.values() if stage in m)
+
+    def latencies(self):
+        spans = {
+            "sensor_to_satellite": ("sent", "analyzed"),
+            "satellite": ("analyzed", "forwarded"),
+            "uplink": ("forwarded", "received"),
+            "ground": ("received", "queued"),
+            "persist": ("queued", "persisted"),
+            "end_to_end": ("sent", "persisted")
+        }
+        result = {}
+        with self.lock:
+            marks = list(self.marks.values())
+        for hop, (begin, end) in spans.items():
+            values = sorted((m[end] - m[begin]) * 1000 for m in marks if begin in m and end in m)
+            result[hop] = {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50), 3) if values else None,
+                "p95_ms": round(percentile(values, 95), 3) if values else None,
+                "p99_ms": round(percentile(values, 99), 3) if values else None
+            }
+        return result
+
+
+def instrument(ids, tracker):
+    """Enveloppe les étages existants pour horodater les messages au passage"""
+    precheck = ids.precheck
+    forward = ids.forward_to_ground
+
+    def precheck_message(message, client_ip):
+        tracker.mark((message.get("sender"), message.get("timestamp")), "analyzed")
+        return precheck(message, client_ip)
+
+    def forward_to_ground(message, record=None):
+        tracker.mark((message.get("sender"), message.get("timestamp")), "forwarded")
+        return forward(message, record)
+
+    ids.precheck = precheck_message
+    ids.forward_to_ground = forward_to_ground
+
+    process = ground.process_satellite_message
+    save = ground.save_telemetry
+    store = ground.store
+    flush = store._flush
+
+    def process_satellite_message(message):
+        tracker.mark((message.get("sender"), message.get("timestamp")), "received")
+        return process(message)
+
+    def save_telemetry(data):
+        tracker.mark((data.get("sensor_id"), data.get("timestamp")), "queued")
+        return save(data)
+
+    def flush_batch(conn, telemetry_rows, security_rows):
+        keys = [(row[0], row[6]) for row in telemetry_rows]
+        flush(conn, telemetry_rows, security_rows)
+        for key in keys:
+            tracker.mark(key, "persisted")
+
+    ground.process_satellite_message = process_satellite_message
+    ground.save_telemetry = save_telemetry
+    store._flush = flush_batch
+
+
+async def drive_sensors(sensor_count, rate, duration, payload_size, port, tracker):
+    deadline = time.monotonic() + duration
+    padding = "x" * payload_size
+    sensors = [VirtualSensor(f"BENCH-{i:05d}", rate, 0.1) for i in range(sensor_count)]
+
+    async def run(sensor):
+        await asyncio.sleep(random.uniform(0, sensor.interval))
+        while time.monotonic() < deadline:
+            data = create_sensor_data(sensor.seq, sensor.sensor_id, sensor.latitude, sensor.longitude)
+            sensor.seq += 1
+            if padding:
+                data["padding"] = padding
+            payload = json.dumps(build_message(data)).encode()
+            tracker.mark((data["sensor_id"], data["timestamp"]), "sent")
+            try:
+                _, writer = await asyncio.open_connection(BENCH_IP, port)
+                writer.write(payload)
+                await writer.drain()
+                writer.close()
+            except OSError:
+                pass
+            await asyncio.sleep(sensor.next_delay())
+
+    await asyncio.gather(*(run(s) for s in sensors))
+
+
+def run_scenario(sensor_count, payload_size, rate, duration, latency, workdir,
+                 forward_mode=satellite_ids.FORWARD_MODE):
+    ground_port = free_port()
+    sat_port = free_port()
+
+    # Base SQLite et file d'écriture propres à chaque scénario
+    ground.DB_PATH = os.path.join(workdir, f"bench_{sensor_count}_{payload_size}.db")
+    ground.store = ground.WriteBehindStore(db_path=ground.DB_PATH)
+    ground.init_database()
+    ground.store.start()
+
+    ids = satellite_ids.IntrusionDetectionSystem(listen_port=sat_port, ground_ip=BENCH_IP,
+                                                 ground_port=ground_port, latency=latency,
+                                                 blocklist_path=None, forward_mode=forward_mode)
+    # Tous les capteurs partagent 127.0.0.1 : détection de flood désactivée pour la mesure
+    ids.flood_limiter.default_limit = float('inf')
+
+    tracker = HopTracker()
+    originals = (ground.process_satellite_message, ground.save_telemetry)
+    instrument(ids, tracker)
+
+    try:
+        threading.Thread(target=ground.receive_from_satellite, args=(BENCH_IP, ground_port), daemon=True).start()
+        wait_for_port(ground_port)
+        threading.Thread(target=lambda: asyncio.run(ids.start_async()), daemon=True).start()
+        wait_for_port(sat_port)
+
+        started = time.perf_counter()
+        asyncio.run(drive_sensors(sensor_count, rate, duration, payload_size, sat_port, tracker))
+        sent = tracker.count("sent")
+
+        # Attente de la fin du pipeline (dernier lot écrit)
+        drain_deadline = time.time() + max(10, latency * 4 + ground.WRITE_FLUSH_INTERVAL * 4)
+        while tracker.count("persisted") < sent and time.time() < drain_deadline:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        persisted = tracker.count("persisted")
+        ground.store.stop()
+        ids.uplink.close()
+    finally:
+        ground.process_satellite_message, ground.save_telemetry = originals
+
+    return {
+        "sensors": sensor_count,
+        "payload_bytes": payload_size,
+        "forward_mode": forward_mode,
+        "rate_per_sensor": rate,
+        "duration_s": duration,
+        "sent": sent,
+        "persisted": persisted,
+        "loss": sent - persisted,
+        "msg_per_s": round(persisted / elapsed, 1) if elapsed else 0.0,
+        "latency": tracker.latencies()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end sensor -> satellite -> ground benchmark")
+    parser.add_argument("--sensors", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--payload-sizes", type=int, nargs="+", default=[0, 1024],
+                        help="extra bytes of padding inside each encrypted reading")
+    parser.add_argument("--rate", type=float, default=1.0, help="messages per second per sensor")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated satellite latency (s)")
+    parser.add_argument("--forward-mode", default=satellite_ids.FORWARD_MODE,
+                        choices=[satellite_ids.FORWARD_ENCRYPTED, satellite_ids.FORWARD_VERIFIED])
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": []
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for sensor_count in args.sensors:
+            for payload_size in args.payload_sizes:
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    result = run_scenario(sensor_count, payload_size, args.rate, args.duration,
+                                          args.latency, workdir, args.forward_mode)
+                report["results"].append(result)
+
+                e2e = result["latency"]["end_to_end"]
+                print(f"[Bench] {sensor_count:5d} sensors, {payload_size:5d} B: "
+                      f"{result['persisted']}/{result['sent']} persisted, {result['msg_per_s']} msg/s, "
+                      f"e2e p50 {e2e['p50_ms']} ms / p95 {e2e['p95_ms']} ms / p99 {e2e['p99_ms']} ms")
+                for hop in HOPS[:-1]:
+                    h = result["latency"][hop]
+                    print(f"        {hop:20s} p50 {h['p50_ms']} / p95 {h['p95_ms']} / p99 {h['p99_ms']} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[Bench] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import socket
+import time
+import os
+import threading
+import asyncio
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from satellite_ids import IntrusionDetectionSystem, SERIAL_BACKLOG
+from iot_sensor import create_sensor_data, encode_message
+from link_protocol import recv_frame
+from wire_format import WIRE_FORMATS, WIRE_JSON, parse_message
+
+# Banc de test local : capteurs simulés -> satellite -> station sol factice
+BENCH_IP = "127.0.0.1"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((BENCH_IP, 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((BENCH_IP, port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+class GroundSink:
+    """Station sol factice qui compte les messages relayés"""
+
+    def __init__(self, port):
+        self.port = port
+        self.received = 0
+        # Instant de réception du dernier message relayé
+        self.last_received = None
+        self.lock = threading.Lock()
+
+    def handle(self, client):
+        with client:
+            while True:
+                try:
+                    frame = recv_frame(client)
+                except OSError:
+                    break
+                if frame is None:
+                    break
+                with self.lock:
+                    self.received += 1
+                    self.last_received = time.perf_counter()
+
+    def serve(self):
+        server = socket.socket()
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((BENCH_IP, self.port))
+        server.listen(512)
+        while True:
+            client, _ = server.accept()
+            threading.Thread(target=self.handle, args=(client,), daemon=True).start()
+
+
+def send_one(port, payload):
+    try:
+        with socket.create_connection((BENCH_IP, port), timeout=30) as s:
+            s.sendall(payload)
+        return True
+    except OSError:
+        return False
+
+
+def compare_wire_formats(count=2000, batch_size=50):
+    """Taille moyenne et temps de décodage de l'enveloppe pour chaque format capteur,
+    puis octets par mesure dans des lots de batch_size mesures"""
+    readings = [create_sensor_data(seq) for seq in range(count)]
+    for wire_format in WIRE_FORMATS:
+        payloads = [encode_message(data, wire_format) for data in readings]
+        start = time.perf_counter()
+        for payload in payloads:
+            parse_message(payload)
+        parse_us = (time.perf_counter() - start) / count * 1e6
+        size = sum(len(p) for p in payloads) / count
+        batches = [encode_message(readings[i:i + batch_size], wire_format) for i in range(0, count, batch_size)]
+        batch_size_per_reading = sum(len(p) for p in batches) / count
+        print(f"[Bench] wire {wire_format:7s}: {size:.0f} B/msg, parse {parse_us:.2f} us/msg, "
+              f"{batch_size_per_reading:.1f} B/reading in batches of {batch_size}")
+
+
+def run_mode(mode, messages, clients, latency, max_connections, crypto_workers=0, wire_format=WIRE_JSON):
+    ground_port = free_port()
+    sat_port = free_port()
+
+    sink = GroundSink(ground_port)
+    threading.Thread(target=sink.serve, daemon=True).start()
+    wait_for_port(ground_port)
+
+    ids = IntrusionDetectionSystem(listen_port=sat_port, ground_ip=BENCH_IP, ground_port=ground_port,
+                                   latency=latency, max_connections=max_connections, blocklist_path=None,
+                                   crypto_workers=crypto_workers)
+    # Tous les capteurs simulés partagent 127.0.0.1 : pas de détection de flood ici
+    ids.flood_limiter.default_limit = float('inf')
+
+    if mode == "async":
+        target = lambda: asyncio.run(ids.start_async())
+    else:
+        target = ids.start
+    threading.Thread(target=target, daemon=True).start()
+    wait_for_port(sat_port)
+    # La sonde de wait_for_port compte comme une connexion vide
+    time.sleep(0.2)
+
+    # Un identifiant par client simulé : la fenêtre anti-rejeu suit chaque capteur séparément
+    payloads = [encode_message(create_sensor_data(seq // clients, f"BENCH-SENSOR-{seq % clients:04d}"), wire_format)
+                for seq in range(messages)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        sent = sum(pool.map(lambda p: send_one(sat_port, p), payloads))
+
+    deadline = time.time() + max(30, messages * latency * 2)
+    while sink.received < sent and time.time() < deadline:
+        time.sleep(0.01)
+    # Jusqu'au dernier message relayé, pas jusqu'à l'échéance ; un message perdu invalide la mesure
+    ok = sent == messages and sink.received == sent
+    elapsed = (sink.last_received or time.perf_counter()) - start
+
+    return {
+        "mode": mode,
+        "clients": clients,
+        "sent": sent,
+        "forwarded": sink.received,
+        "ok": ok,
+        "elapsed_s": round(elapsed, 3),
+        "msg_per_s": round(sink.received / elapsed, 1) if ok and elapsed else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Satellite relay throughput: serial vs asyncio")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--crypto-workers", type=int, default=0, help="decryption workers in async mode")
+    parser.add_argument("--wire-format", choices=WIRE_FORMATS, default=WIRE_JSON)
+    parser.add_argument("--modes", nargs="+", choices=["serial", "async"], default=["serial", "async"])
+    args = parser.parse_args()
+
+    print(f"[Bench] {args.messages} messages, {args.clients} clients, latency {args.latency}s, "
+          f"{args.wire_format} wire format")
+    compare_wire_formats()
+
+    results = []
+    for mode in args.modes:
+        # Le serveur série accepte une connexion à la fois : au-delà de sa file d'attente,
+        # les connexions en trop sont perdues, d'où un nombre de clients limité
+        clients = min(args.clients, SERIAL_BACKLOG) if mode == "serial" else args.clients
+        # Les print() du satellite faussent la mesure
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = run_mode(mode, args.messages, clients, args.latency, args.max_connections,
+                              args.crypto_workers, args.wire_format)
+        results.append(result)
+        if result["ok"]:
+            print(f"[Bench] {mode:6s}: {result['forwarded']}/{result['sent']} forwarded "
+                  f"in {result['elapsed_s']}s with {clients} clients -> {result['msg_per_s']} msg/s")
+        else:
+            print(f"[Bench] {mode:6s}: FAILED, {result['forwarded']}/{result['sent']} forwarded "
+                  f"({args.messages} to send, {clients} clients)")
+
+    if len(results) == 2 and all(r["ok"] for r in results):
+        print(f"[Bench] Speedup async/serial: {results[1]['msg_per_s'] / results[0]['msg_per_s']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,168 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, g
 import socket
 import json
 import threading
 import sqlite3
-from datetime import datetime
+import queue
+import time
+import atexit
+import hashlib
+import base64
+import csv
+import io
+import argparse
+import multiprocessing
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
 from cryptography.fernet import Fernet
+import numpy as np
 import plotly.graph_objs as go
 import plotly.utils
 import random
+from link_protocol import FrameReader, MAX_FRAME_SIZE, derive_link_key, verify_record
+from wire_format import decode_records, recv_message
+import metrics
 
 app = Flask(__name__)
 
 SECRET_KEY = b'GS****************************ss='
+cipher = Fernet(SECRET_KEY)
+LINK_KEY = derive_link_key(SECRET_KEY)
 DISCORD_WEBHOOK = "VOTRE_WEBHOOK_DISCORD"
 
-telemetry_data = []
-alerts = []
-system_status = {
-    "satellite_connected": False,
-    "last_message": None,
-    "message_count": 0,
-    "attack_count": 0
+DB_PATH = 'satellite_monitoring.db'
+GROUND_LISTEN_IP = '0.0.0.0'
+GROUND_PORT = 5001
+# Taille max d'une trame du lien satellite (les lots d'alertes sont les plus gros)
+LINK_MAX_FRAME_SIZE = MAX_FRAME_SIZE
+# Ingestion multi-processus : 0 = thread de réception dans le processus Flask.
+# Les résultats décodés remontent au processus Flask par une file bornée (contre-pression)
+INGEST_WORKERS = 0
+INGEST_QUEUE_SIZE = 10000
+INGEST_BACKLOG = 64
+# Écriture différée : vidage par lots de WRITE_BATCH_SIZE lignes ou toutes les WRITE_FLUSH_INTERVAL secondes
+WRITE_BATCH_SIZE = 500
+WRITE_FLUSH_INTERVAL = 1.0
+# Données chaudes gardées HOT_DATA_DAYS jours, puis archivées ; archive purgée après RETENTION_DAYS
+HOT_DATA_DAYS = 7
+RETENTION_DAYS = 90
+RETENTION_INTERVAL = 3600
+# Agrégats par minute conservés ROLLUP_MINUTE_DAYS jours (les agrégats horaires suivent RETENTION_DAYS)
+ROLLUP_MINUTE_DAYS = 2
+ROLLUP_FIELDS = ('temperature', 'humidity', 'battery')
+# Préfixe du timestamp isoformat qui définit le bucket : 'YYYY-MM-DDTHH:MM' / 'YYYY-MM-DDTHH'
+ROLLUP_RESOLUTIONS = {
+    'minute': ('telemetry_rollup_minute', 16),
+    'hour': ('telemetry_rollup_hour', 13)
 }
+# Flux SSE : file par client, keepalive et fréquence de diffusion des statistiques
+SSE_QUEUE_SIZE = 1000
+SSE_KEEPALIVE = 15
+STATS_PUSH_INTERVAL = 10
+# Graphiques : cache des réponses sérialisées, invalidé à chaque nouveau lot de télémétrie
+CHART_CACHE_SIZE = 64
+CHART_DEFAULT_POINTS = 50
+CHART_MAX_POINTS = 5000
+# Graphiques sur une plage (start/end) : réduits côté serveur à environ CHART_TARGET_POINTS points
+CHART_TARGET_POINTS = 500
+CHART_DOWNSAMPLE_METHODS = ('minmax', 'lttb', 'none')
+CHART_COLORS = ['#FF6B6B', '#4ECDC4', '#FFD93D', '#A78BFA', '#34D399', '#F472B6']
+CHART_UNITS = {'temperature': '°C', 'humidity': '%', 'battery': '%'}
+# Historique : champs interrogeables, taille des pages, lecture par blocs des exports
+HISTORY_FIELDS = ('temperature', 'humidity', 'battery', 'latitude', 'longitude')
+HISTORY_DEFAULT_LIMIT = 500
+HISTORY_MAX_LIMIT = 5000
+EXPORT_FETCH_SIZE = 1000
+# État temps réel en mémoire : tampons circulaires bornés
+LIVE_READINGS_PER_SENSOR = 100
+LIVE_RECENT_READINGS = 100
+LIVE_MAX_SENSORS = 10000
+LIVE_MAX_ALERTS = 500
 
-def init_database():
-    conn = sqlite3.connect('satellite_monitoring.db', check_same_thread=False)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+# Métriques de la station sol, exposées en GET /metrics (format Prometheus)
+LINK_CONNECTIONS = metrics.counter("ground_link_connections_total", "Satellite link connections accepted")
+LINK_FRAMES = metrics.counter("ground_link_frames_total", "Messages received from the satellite")
+READINGS = metrics.counter("ground_readings_total", "Sensor readings decoded")
+PROCESSING_ERRORS = metrics.counter("ground_processing_errors_total", "Satellite messages that failed processing")
+STAGE_SECONDS = metrics.histogram("ground_stage_seconds", "Processing time per pipeline stage", ("stage",))
+PROCESS_SECONDS = STAGE_SECONDS.labels(stage="process")
+DECRYPT_SECONDS = STAGE_SECONDS.labels(stage="decrypt")
+SAVE_SECONDS = STAGE_SECONDS.labels(stage="save")
+API_SECONDS = metrics.histogram("ground_api_request_seconds", "Flask handler time per route", ("route",))
+WRITE_QUEUE_DEPTH = metrics.gauge("ground_write_queue_depth", "Rows waiting in the write-behind queue")
+SSE_SUBSCRIBERS = metrics.gauge("ground_sse_subscribers", "Connected server-sent event clients")
+
+class LiveState:
+    """État temps réel partagé entre le récepteur et les routes Flask, protégé par un verrou"""
+
+    def __init__(self, per_sensor=LIVE_READINGS_PER_SENSOR, recent=LIVE_RECENT_READINGS,
+                 max_sensors=LIVE_MAX_SENSORS, max_alerts=LIVE_MAX_ALERTS):
+        self.lock = threading.Lock()
+        self.per_sensor = per_sensor
+        self.max_sensors = max_sensors
+        self.by_sensor = OrderedDict()
+        self.recent = deque(maxlen=recent)
+        self.alerts = deque(maxlen=max_alerts)
+        self.status = {
+            "satellite_connected": False,
+            "last_message": None,
+            "message_count": 0,
+            "attack_count": 0
+        }
+
+    def add_reading(self, reading):
+        """Enregistre une mesure et renvoie une copie cohérente du statut"""
+        sensor_id = reading.get('sensor_id')
+        with self.lock:
+            readings = self.by_sensor.get(sensor_id)
+            if readings is None:
+                readings = self.by_sensor[sensor_id] = deque(maxlen=self.per_sensor)
+                if len(self.by_sensor) > self.max_sensors:
+                    self.by_sensor.popitem(last=False)
+            else:
+                self.by_sensor.move_to_end(sensor_id)
+            readings.append(reading)
+            self.recent.append(reading)
+            self.status["message_count"] += 1
+            self.status["last_message"] = datetime.now().isoformat()
+            return dict(self.status)
+
+    def add_alert(self, alert):
+        with self.lock:
+            self.alerts.append(alert)
+
+    def set_connected(self, connected):
+        with self.lock:
+            self.status["satellite_connected"] = connected
+
+    def status_snapshot(self):
+        with self.lock:
+            return dict(self.status)
+
+    def telemetry_snapshot(self, limit=20, sensor_id=None):
+        with self.lock:
+            source = self.recent if sensor_id is None else self.by_sensor.get(sensor_id, ())
+            readings = list(source)[-limit:] if limit > 0 else []
+            return readings, dict(self.status)
+
+    def alerts_snapshot(self, limit=50):
+        with self.lock:
+            return list(self.alerts)[-limit:]
+
+    def sizes(self):
+        with self.lock:
+            return {
+                "sensors": len(self.by_sensor),
+                "recent": len(self.recent),
+                "alerts": len(self.alerts)
+            }
+
+live_state = LiveState()
+
+# Migrations du schéma, appliquées dans l'ordre selon PRAGMA user_version
+MIGRATIONS = [
+    # v1 : schéma initial
+    '''
         CREATE TABLE IF NOT EXISTS telemetry (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             sensor_id TEXT,
@@ -38,10 +173,8 @@ def init_database():
             longitude REAL,
             timestamp DATETIME,
             received_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
+        );
+
         CREATE TABLE IF NOT EXISTS security_events (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             event_type TEXT,
@@ -49,21 +182,328 @@ def init_database():
             details TEXT,
             severity TEXT,
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    conn.commit()
+        );
+    ''',
+    # v2 : index pour les requêtes du dashboard + tables d'archive
+    '''
+        CREATE INDEX IF NOT EXISTS idx_telemetry_sensor_time ON telemetry(sensor_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_telemetry_time ON telemetry(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_security_time_severity ON security_events(timestamp, severity);
+        CREATE INDEX IF NOT EXISTS idx_security_severity ON security_events(severity);
+
+        CREATE TABLE IF NOT EXISTS telemetry_archive (
+            id INTEGER PRIMARY KEY,
+            sensor_id TEXT,
+            temperature REAL,
+            humidity REAL,
+            battery REAL,
+            latitude REAL,
+            longitude REAL,
+            timestamp DATETIME,
+            received_at DATETIME
+        );
+        CREATE INDEX IF NOT EXISTS idx_telemetry_archive_sensor_time ON telemetry_archive(sensor_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_telemetry_archive_time ON telemetry_archive(timestamp);
+
+        CREATE TABLE IF NOT EXISTS security_events_archive (
+            id INTEGER PRIMARY KEY,
+            event_type TEXT,
+            source_ip TEXT,
+            details TEXT,
+            severity TEXT,
+            timestamp DATETIME
+        );
+        CREATE INDEX IF NOT EXISTS idx_security_archive_time ON security_events_archive(timestamp);
+    ''',
+    # v3 : agrégats incrémentaux par minute/heure et compteurs globaux
+    '''
+        CREATE TABLE IF NOT EXISTS telemetry_rollup_minute (
+            bucket TEXT,
+            sensor_id TEXT,
+            count INTEGER,
+            temperature_sum REAL, temperature_min REAL, temperature_max REAL,
+            humidity_sum REAL, humidity_min REAL, humidity_max REAL,
+            battery_sum REAL, battery_min REAL, battery_max REAL,
+            PRIMARY KEY (bucket, sensor_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_rollup_minute_sensor ON telemetry_rollup_minute(sensor_id, bucket);
+
+        CREATE TABLE IF NOT EXISTS telemetry_rollup_hour (
+            bucket TEXT,
+            sensor_id TEXT,
+            count INTEGER,
+            temperature_sum REAL, temperature_min REAL, temperature_max REAL,
+            humidity_sum REAL, humidity_min REAL, humidity_max REAL,
+            battery_sum REAL, battery_min REAL, battery_max REAL,
+            PRIMARY KEY (bucket, sensor_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_rollup_hour_sensor ON telemetry_rollup_hour(sensor_id, bucket);
+
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        );
+
+        INSERT OR IGNORE INTO telemetry_rollup_minute
+        SELECT substr(timestamp, 1, 16), sensor_id, COUNT(*),
+               SUM(temperature), MIN(temperature), MAX(temperature),
+               SUM(humidity), MIN(humidity), MAX(humidity),
+               SUM(battery), MIN(battery), MAX(battery)
+        FROM telemetry WHERE timestamp IS NOT NULL
+        GROUP BY 1, 2;
+
+        INSERT OR IGNORE INTO telemetry_rollup_hour
+        SELECT substr(timestamp, 1, 13), sensor_id, COUNT(*),
+               SUM(temperature), MIN(temperature), MAX(temperature),
+               SUM(humidity), MIN(humidity), MAX(humidity),
+               SUM(battery), MIN(battery), MAX(battery)
+        FROM (SELECT * FROM telemetry UNION ALL SELECT * FROM telemetry_archive)
+        WHERE timestamp IS NOT NULL
+        GROUP BY 1, 2;
+
+        INSERT OR IGNORE INTO stats_counters
+        SELECT 'telemetry', (SELECT COUNT(*) FROM telemetry) + (SELECT COUNT(*) FROM telemetry_archive);
+
+        INSERT OR IGNORE INTO stats_counters
+        SELECT 'security:' || severity, COUNT(*)
+        FROM (SELECT severity FROM security_events UNION ALL SELECT severity FROM security_events_archive)
+        WHERE severity IS NOT NULL
+        GROUP BY severity;
+    '''
+]
+
+def _rollup_upsert_sql(table):
+    columns = ['bucket', 'sensor_id', 'count']
+    updates = ['count = count + excluded.count']
+    for field in ROLLUP_FIELDS:
+        columns += [f'{field}_sum', f'{field}_min', f'{field}_max']
+        updates += [
+            f'{field}_sum = COALESCE({field}_sum, 0) + COALESCE(excluded.{field}_sum, 0)',
+            f'{field}_min = COALESCE(MIN({field}_min, excluded.{field}_min), {field}_min, excluded.{field}_min)',
+            f'{field}_max = COALESCE(MAX({field}_max, excluded.{field}_max), {field}_max, excluded.{field}_max)'
+        ]
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT(bucket, sensor_id) DO UPDATE SET {', '.join(updates)}")
+
+ROLLUP_UPSERT_SQL = {table: _rollup_upsert_sql(table) for table, _ in ROLLUP_RESOLUTIONS.values()}
+
+COUNTER_UPSERT_SQL = '''
+    INSERT INTO stats_counters (name, value) VALUES (?, ?)
+    ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+'''
+
+def compute_rollups(telemetry_rows):
+    """Agrège un lot de lignes telemetry en deltas par (bucket, sensor_id) pour chaque résolution"""
+    deltas = {table: {} for table, _ in ROLLUP_RESOLUTIONS.values()}
+    for row in telemetry_rows:
+        sensor_id, values, timestamp = row[0], row[1:4], row[6]
+        if not timestamp:
+            continue
+        for table, prefix in ROLLUP_RESOLUTIONS.values():
+            key = (timestamp[:prefix], sensor_id)
+            agg = deltas[table].get(key)
+            if agg is None:
+                agg = deltas[table][key] = [0] + [None] * (3 * len(ROLLUP_FIELDS))
+            agg[0] += 1
+            for i, value in enumerate(values):
+                if value is None:
+                    continue
+                base = 1 + 3 * i
+                if agg[base] is None:
+                    agg[base:base + 3] = [value, value, value]
+                else:
+                    agg[base] += value
+                    agg[base + 1] = min(agg[base + 1], value)
+                    agg[base + 2] = max(agg[base + 2], value)
+    return {table: [key + tuple(agg) for key, agg in rows.items()] for table, rows in deltas.items()}
+
+def migrate_database(conn):
+    """Amène la base au dernier schéma, une migration par transaction"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, len(MIGRATIONS) + 1):
+        conn.executescript(f"BEGIN; {MIGRATIONS[target - 1]} PRAGMA user_version = {target}; COMMIT;")
+        print(f"[Ground] Database migrated to schema v{target}")
+
+def init_database():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    migrate_database(conn)
     conn.close()
     print("[Ground] Database initialized")
 
+def archive_old_data(hot_days=HOT_DATA_DAYS, retention_days=RETENTION_DAYS):
+    """Bascule les lignes anciennes vers les tables d'archive et purge l'archive"""
+    # telemetry.timestamp vient du capteur (isoformat local), security_events.timestamp de SQLite (UTC)
+    telemetry_cutoff = (datetime.now() - timedelta(days=hot_days)).isoformat()
+    telemetry_expiry = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    security_cutoff = f"-{hot_days} days"
+    security_expiry = f"-{retention_days} days"
+
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        with conn:
+            archived = conn.execute('''
+                INSERT OR IGNORE INTO telemetry_archive
+                SELECT * FROM telemetry WHERE timestamp < ?
+            ''', (telemetry_cutoff,)).rowcount
+            conn.execute("DELETE FROM telemetry WHERE timestamp < ?", (telemetry_cutoff,))
+
+            archived += conn.execute('''
+                INSERT OR IGNORE INTO security_events_archive
+                SELECT * FROM security_events WHERE timestamp < datetime('now', ?)
+            ''', (security_cutoff,)).rowcount
+            conn.execute("DELETE FROM security_events WHERE timestamp < datetime('now', ?)", (security_cutoff,))
+
+            purged = conn.execute("DELETE FROM telemetry_archive WHERE timestamp < ?",
+                                  (telemetry_expiry,)).rowcount
+            purged += conn.execute("DELETE FROM security_events_archive WHERE timestamp < datetime('now', ?)",
+                                   (security_expiry,)).rowcount
+
+            minute_expiry = (datetime.now() - timedelta(days=ROLLUP_MINUTE_DAYS)).isoformat()
+            conn.execute("DELETE FROM telemetry_rollup_minute WHERE bucket < ?", (minute_expiry[:16],))
+            conn.execute("DELETE FROM telemetry_rollup_hour WHERE bucket < ?", (telemetry_expiry[:13],))
+    finally:
+        conn.close()
+    if archived:
+        store.telemetry_version += 1
+    return archived, purged
+
+def retention_worker(interval=RETENTION_INTERVAL):
+    """Tâche périodique d'archivage et de rétention"""
+    while True:
+        try:
+            archived, purged = archive_old_data()
+            if archived or purged:
+                print(f"[Ground] Retention: {archived} rows archived, {purged} rows purged")
+        except sqlite3.Error as e:
+            print(f"[Ground] Retention error: {e}")
+        time.sleep(interval)
+
+class WriteBehindStore:
+    """File d'écriture différée : une connexion SQLite, insertions par lots"""
+
+    TELEMETRY = 'telemetry'
+    SECURITY = 'security'
+
+    def __init__(self, db_path=DB_PATH, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = None
+        self._stop = object()
+
+        self.max_queue_depth = 0
+        self.rows_written = 0
+        self.batches_flushed = 0
+        self.last_flush_ms = 0.0
+        self.errors = 0
+        # Incrémenté quand la table telemetry change (invalide le cache des graphiques)
+        self.telemetry_version = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def put(self, kind, row):
+        self.queue.put((kind, row))
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def stop(self, timeout=10):
+        """Vide la file sur disque puis ferme la connexion"""
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(self._stop)
+            self.thread.join(timeout)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "rows_written": self.rows_written,
+            "batches_flushed": self.batches_flushed,
+            "last_flush_ms": self.last_flush_ms,
+            "errors": self.errors
+        }
+
+    def _flush(self, conn, telemetry_rows, security_rows):
+        if not telemetry_rows and not security_rows:
+            return
+        started = time.perf_counter()
+        try:
+            with conn:
+                if telemetry_rows:
+                    conn.executemany('''
+                        INSERT INTO telemetry 
+                        (sensor_id, temperature, humidity, battery, latitude, longitude, timestamp)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', telemetry_rows)
+                    for table, rows in compute_rollups(telemetry_rows).items():
+                        conn.executemany(ROLLUP_UPSERT_SQL[table], rows)
+                    conn.execute(COUNTER_UPSERT_SQL, ('telemetry', len(telemetry_rows)))
+                if security_rows:
+                    conn.executemany('''
+                        INSERT INTO security_events (event_type, source_ip, details, severity, timestamp)
+                        VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                    ''', security_rows)
+                    severities = {}
+                    for row in security_rows:
+                        if row[3] is not None:
+                            severities[row[3]] = severities.get(row[3], 0) + 1
+                    conn.executemany(COUNTER_UPSERT_SQL,
+                                     [(f'security:{severity}', n) for severity, n in severities.items()])
+            self.rows_written += len(telemetry_rows) + len(security_rows)
+            self.batches_flushed += 1
+            if telemetry_rows:
+                self.telemetry_version += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"[Ground] Database write error ({len(telemetry_rows) + len(security_rows)} rows lost): {e}")
+        elapsed = time.perf_counter() - started
+        SAVE_SECONDS.observe(elapsed)
+        self.last_flush_ms = round(elapsed * 1000, 2)
+        telemetry_rows.clear()
+        security_rows.clear()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        telemetry_rows = []
+        security_rows = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is self._stop:
+                stopping = True
+            elif item is not None:
+                kind, row = item
+                if kind == self.TELEMETRY:
+                    telemetry_rows.append(row)
+                else:
+                    security_rows.append(row)
+
+            pending = len(telemetry_rows) + len(security_rows)
+            if stopping or pending >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(conn, telemetry_rows, security_rows)
+                deadline = time.monotonic() + self.flush_interval
+
+        conn.close()
+
+store = WriteBehindStore()
+WRITE_QUEUE_DEPTH.set_function(lambda: store.queue.qsize())
+
 def save_telemetry(data):
-    conn = sqlite3.connect('satellite_monitoring.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO telemetry 
-        (sensor_id, temperature, humidity, battery, latitude, longitude, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
+    store.put(WriteBehindStore.TELEMETRY, (
         data.get('sensor_id'),
         data.get('temperature'),
         data.get('humidity'),
@@ -72,66 +512,260 @@ def save_telemetry(data):
         data.get('longitude'),
         data.get('timestamp')
     ))
-    conn.commit()
-    conn.close()
 
-def save_security_event(event_type, source_ip, details, severity):
-    conn = sqlite3.connect('satellite_monitoring.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO security_events (event_type, source_ip, details, severity)
-        VALUES (?, ?, ?, ?)
-    ''', (event_type, source_ip, details, severity))
-    conn.commit()
-    conn.close()
+class EventBroker:
+    """Diffuse les nouveaux événements aux clients SSE du dashboard"""
 
-def receive_from_satellite():
-    global telemetry_data, alerts, system_status
-    
-    print("[Ground] Starting satellite receiver...")
-    
+    def __init__(self, queue_size=SSE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.subscribers = set()
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        q.lagging = False
+        with self.lock:
+            self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def publish(self, event, data):
+        if not self.subscribers:
+            return
+        # Sérialisé une seule fois pour tous les clients
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                # Client trop lent : son flux est fermé, il se reconnecte et recharge tout
+                q.lagging = True
+
+broker = EventBroker()
+SSE_SUBSCRIBERS.set_function(lambda: len(broker.subscribers))
+
+def event_time(timestamp):
+    """Horodatage ISO (naïf = heure locale) -> format UTC de security_events.timestamp, None si invalide"""
+    try:
+        return datetime.fromisoformat(timestamp).astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+
+def save_security_event(event_type, source_ip, details, severity, timestamp=None):
+    """timestamp : heure UTC de l'événement à la source ('YYYY-MM-DD HH:MM:SS'), sinon heure d'écriture"""
+    store.put(WriteBehindStore.SECURITY, (event_type, source_ip, details, severity, timestamp))
+    broker.publish('security', {
+        "type": event_type,
+        "source": source_ip,
+        "details": details,
+        "severity": severity,
+        "time": timestamp or time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+    })
+
+def process_satellite_message(message):
+    """Déchiffre et enregistre un message relayé par le satellite"""
+    LINK_FRAMES.inc()
+    with PROCESS_SECONDS.time():
+        _process_satellite_message(message)
+
+def _process_satellite_message(message):
+    try:
+        apply_satellite_message(*decode_satellite_message(message))
+    except Exception as e:
+        report_processing_error(e)
+
+def decode_satellite_message(message):
+    """Partie coûteuse et sans état (MAC, déchiffrement, décodage) : ('alerts' | 'readings', liste).
+    Exécutable dans un processus d'ingestion."""
+    if 'alerts' in message:
+        # Lot d'alertes de l'IDS du satellite, signé avec la clé du lien
+        alerts = message['alerts'].encode('utf-8')
+        if not verify_record(LINK_KEY, alerts, message.get('mac')):
+            raise ValueError("Invalid link MAC on alert batch")
+        return 'alerts', json.loads(alerts)
+
+    if 'record' in message:
+        # Mesure déjà déchiffrée et validée par le satellite : seule la MAC du lien est vérifiée
+        decrypted = message['record'].encode('utf-8')
+        if not verify_record(LINK_KEY, decrypted, message.get('mac')):
+            raise ValueError("Invalid link MAC")
+    else:
+        encrypted = message['encrypted_data'].encode('latin-1')
+        with DECRYPT_SECONDS.time():
+            decrypted = cipher.decrypt(encrypted)
+    # Texte clair JSON ou binaire, une mesure ou un lot (file d'attente du capteur)
+    return 'readings', decode_records(decrypted)
+
+def apply_satellite_message(kind, items):
+    """Écriture et diffusion : toujours dans le processus Flask, seul détenteur de l'état temps réel"""
+    if kind == 'alerts':
+        for alert in items:
+            # Heure de détection à bord, pas celle de réception (lots différés pendant une coupure)
+            save_security_event(alert["type"], alert["source"], alert["details"], alert["severity"],
+                                event_time(alert.get("timestamp")))
+        return
+
+    for sensor_data in items:
+        READINGS.inc()
+        save_telemetry(sensor_data)
+        status = live_state.add_reading(sensor_data)
+        broker.publish('telemetry', {"reading": sensor_data, "status": status})
+
+        print(f"[Ground] Received: {sensor_data['sensor_id']} - {sensor_data['temperature']}°C")
+
+def report_processing_error(error):
+    PROCESSING_ERRORS.inc()
+    print(f"[Ground] Processing error: {error}")
+    live_state.add_alert({
+        "type": "PROCESSING_ERROR",
+        "message": str(error),
+        "time": datetime.now().strftime("%H:%M:%S"),
+        "severity": "HIGH"
+    })
+
+def process_satellite_frame(frame):
+    try:
+        message = json.loads(frame)
+    except ValueError as e:
+        # Trame illisible mais flux toujours synchronisé : on passe à la suivante
+        PROCESSING_ERRORS.inc()
+        print(f"[Ground] Invalid frame: {e}")
+        return
+    process_satellite_message(message)
+
+def handle_satellite_link(client, addr, process_frame=process_satellite_frame):
+    """Lit les messages d'une connexion satellite jusqu'à sa fermeture"""
+    with client:
+        try:
+            first = client.recv(1, socket.MSG_PEEK)
+            if not first:
+                return
+
+            # Ancien format : un JSON brut par connexion
+            if first == b'{':
+                process_frame(recv_message(client))
+                return
+
+            # Lien persistant : trames préfixées par leur longueur, découpées dans un seul tampon
+            for frame in FrameReader(max_size=LINK_MAX_FRAME_SIZE).frames(client):
+                process_frame(frame)
+
+        except Exception as e:
+            print(f"[Ground] Link error from {addr[0]}: {e}")
+
+def listen_satellite(host=GROUND_LISTEN_IP, port=GROUND_PORT, reuse_port=False, backlog=5):
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server.bind(('0.0.0.0', 5001))
-    server.listen(5)
+    if reuse_port:
+        # Plusieurs processus sur le même port, le noyau répartit les connexions
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server.bind((host, port))
+    server.listen(backlog)
+    return server
+
+def receive_from_satellite(host=GROUND_LISTEN_IP, port=GROUND_PORT):
+    print("[Ground] Starting satellite receiver...")
+    
+    server = listen_satellite(host, port)
     
     while True:
         try:
             client, addr = server.accept()
-            system_status["satellite_connected"] = True
+            LINK_CONNECTIONS.inc()
+            live_state.set_connected(True)
+            threading.Thread(target=handle_satellite_link, args=(client, addr), daemon=True).start()
 
-            data = client.recv(4096).decode('utf-8')
-            message = json.loads(data)
+        except Exception as e:
+            print(f"[Ground] Error: {e}")
 
-            try:
-                cipher = Fernet(SECRET_KEY)
-                encrypted = message['encrypted_data'].encode('latin-1')
-                decrypted = cipher.decrypt(encrypted).decode('utf-8')
-                sensor_data = json.loads(decrypted)
+def ingest_frame(results, frame):
+    """Décode une trame dans le processus d'ingestion et en transmet le résultat au processus Flask"""
+    started = time.perf_counter()
+    try:
+        message = json.loads(frame)
+    except ValueError as e:
+        results.put(('invalid', str(e), 0.0))
+        return
+    try:
+        kind, items = decode_satellite_message(message)
+    except Exception as e:
+        kind, items = 'error', str(e)
+    results.put((kind, items, time.perf_counter() - started))
 
-                telemetry_data.append(sensor_data)
-                if len(telemetry_data) > 100:
-                    telemetry_data.pop(0)
+def ingest_worker(results, host, port, server=None):
+    """Processus d'ingestion : accepte les connexions satellite (SO_REUSEPORT, ou socket d'écoute
+    partagé) et décode les trames en parallèle des autres processus"""
+    if server is None:
+        server = listen_satellite(host, port, reuse_port=True, backlog=INGEST_BACKLOG)
+    process_frame = lambda frame: ingest_frame(results, frame)
 
-                save_telemetry(sensor_data)
-                system_status["message_count"] += 1
-                system_status["last_message"] = datetime.now().isoformat()
+    while True:
+        try:
+            client, addr = server.accept()
+            results.put(('connected', None, 0.0))
+            threading.Thread(target=handle_satellite_link, args=(client, addr, process_frame),
+                             daemon=True).start()
+        except Exception as e:
+            print(f"[Ground] Ingest worker error: {e}")
 
-                print(f"[Ground] Received: {sensor_data['sensor_id']} - {sensor_data['temperature']}°C")
+def collect_ingest_results(results):
+    """Applique dans le processus Flask les résultats des processus d'ingestion"""
+    while True:
+        kind, items, seconds = results.get()
+        if kind == 'connected':
+            LINK_CONNECTIONS.inc()
+            live_state.set_connected(True)
+            continue
+        if kind == 'invalid':
+            PROCESSING_ERRORS.inc()
+            print(f"[Ground] Invalid frame: {items}")
+            continue
+        LINK_FRAMES.inc()
+        PROCESS_SECONDS.observe(seconds)
+        try:
+            if kind == 'error':
+                raise ValueError(items)
+            apply_satellite_message(kind, items)
+        except Exception as e:
+            report_processing_error(e)
 
-            except Exception as e:
-                print(f"[Ground] Processing error: {e}")
-                alerts.append({
-                    "type": "PROCESSING_ERROR",
-                    "message": str(e),
-                    "time": datetime.now().strftime("%H:%M:%S"),
-                    "severity": "HIGH"
-                })
+def start_ingest_workers(workers, host=GROUND_LISTEN_IP, port=GROUND_PORT):
+    """Lance `workers` processus d'ingestion et le collecteur de leurs résultats"""
+    # spawn : les processus ne dépendent pas des threads déjà démarrés dans le processus Flask
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue(INGEST_QUEUE_SIZE)
+    reuse_port = hasattr(socket, 'SO_REUSEPORT')
+    shared = None if reuse_port else listen_satellite(host, port, backlog=INGEST_BACKLOG)
+    processes = []
+    for _ in range(workers):
+        process = context.Process(target=ingest_worker, args=(results, host, port, shared), daemon=True)
+        process.start()
+        processes.append(process)
+    threading.Thread(target=collect_ingest_results, args=(results,), daemon=True).start()
+    print(f"[Ground] Ingest: {workers} worker processes "
+          f"({'SO_REUSEPORT' if reuse_port else 'shared listening socket'}) on port {port}")
+    return processes
 
-            client.close()
+# Durée de chaque handler, par route (et non par URL, pour borner le nombre de séries)
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
 
-        except Exception as e:
-            print(f"[Ground] Error: {e}")
+@app.after_request
+def observe_request_time(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        API_SECONDS.labels(route=route).observe(time.perf_counter() - started)
+    return response
 
 # Routes Flask
 @app.route('/')
@@ -142,15 +776,165 @@ def dashboard():
 @app.route('/api/telemetry')
 def api_telemetry():
     """API des données télémetriques"""
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    readings, status = live_state.telemetry_snapshot(limit, request.args.get('sensor_id'))
     return jsonify({
-        "telemetry": telemetry_data[-20:],  
-        "status": system_status
+        "telemetry": readings,  
+        "status": status
     })
 
+def encode_cursor(timestamp, row_id):
+    """Position (timestamp, id) de la dernière ligne rendue -> curseur opaque"""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, row_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+    if not isinstance(timestamp, str) or not isinstance(row_id, int):
+        raise ValueError("invalid cursor")
+    return timestamp, row_id
+
+def history_args(export):
+    """Filtres de /api/telemetry/history ; ValueError si un paramètre est invalide"""
+    fields = request.args.get('fields')
+    fields = tuple(fields.split(',')) if fields else HISTORY_FIELDS
+    unknown = [field for field in fields if field not in HISTORY_FIELDS]
+    if unknown:
+        raise ValueError(f"fields must be among {list(HISTORY_FIELDS)}")
+    order = request.args.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be asc or desc")
+    limit = request.args.get('limit')
+    try:
+        # Un export va jusqu'au bout de la plage, sauf limite explicite
+        limit = None if export and limit is None else int(limit or HISTORY_DEFAULT_LIMIT)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit is not None and not export:
+        limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+    cursor = request.args.get('cursor')
+    return {
+        "sensor_ids": request.args.getlist('sensor_id'),
+        "fields": fields,
+        "start": request.args.get('start'),
+        "end": request.args.get('end'),
+        "cursor": decode_cursor(cursor) if cursor else None,
+        "descending": order == 'desc',
+        "limit": limit
+    }
+
+def history_query(sensor_ids, fields, start, end, cursor, descending, limit, non_null=False):
+    """Requête keyset sur la télémétrie chaude et archivée, triée par (timestamp, id).
+    Chaque branche suit son index sur timestamp : la fusion s'arrête dès la limite atteinte,
+    quelle que soit la profondeur du curseur (pas d'OFFSET)."""
+    where = ["timestamp IS NOT NULL"]
+    if non_null:
+        where.extend(f"{field} IS NOT NULL" for field in fields)
+    params = []
+    if sensor_ids:
+        where.append(f"sensor_id IN ({', '.join('?' * len(sensor_ids))})")
+        params.extend(sensor_ids)
+    if start:
+        where.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        where.append("timestamp <= ?")
+        params.append(end)
+    if cursor:
+        op = '<' if descending else '>'
+        where.append(f"timestamp {op}= ? AND (timestamp {op} ? OR id {op} ?)")
+        params.extend([cursor[0], cursor[0], cursor[1]])
+
+    select = f"SELECT id, sensor_id, timestamp, {', '.join(fields)} FROM %s WHERE {' AND '.join(where)}"
+    direction = 'DESC' if descending else 'ASC'
+    query = f"{select % 'telemetry'} UNION ALL {select % 'telemetry_archive'} ORDER BY timestamp {direction}, id {direction}"
+    params = params * 2
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+def history_rows(query, params):
+    """Lignes par blocs de EXPORT_FETCH_SIZE : un export ne tient jamais en mémoire en entier"""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def export_history(args, export_format):
+    """Réponse en flux (générateur) : CSV ou une mesure JSON par ligne"""
+    columns = ('id', 'sensor_id', 'timestamp') + args['fields']
+    query, params = history_query(**args)
+
+    def generate_csv():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for rows in history_rows(query, params):
+            writer.writerows(rows)
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+        if out.tell():
+            yield out.getvalue()
+
+    def generate_ndjson():
+        for rows in history_rows(query, params):
+            yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=telemetry.{export_format}',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/telemetry/history')
+def api_telemetry_history():
+    """Historique stocké (tables chaude et archive) : sensor_id, fields, start, end, order,
+    limit, cursor ; format=csv|ndjson pour un export en flux de toute la plage"""
+    export_format = request.args.get('format', 'json')
+    if export_format not in ('json', 'csv', 'ndjson'):
+        return jsonify({"error": "format must be json, csv or ndjson"}), 400
+    try:
+        args = history_args(export_format != 'json')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if export_format != 'json':
+        return export_history(args, export_format)
+
+    # Une ligne de plus que la page pour savoir s'il reste une suite
+    limit = args['limit']
+    query, params = history_query(**dict(args, limit=limit + 1))
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+
+    columns = ('id', 'sensor_id', 'timestamp') + args['fields']
+    readings = [dict(zip(columns, row)) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[2], last[0])
+    return jsonify({"readings": readings, "count": len(readings), "next_cursor": next_cursor})
+
 @app.route('/api/security')
 def api_security():
     """API des événements de sécurité"""
-    conn = sqlite3.connect('satellite_monitoring.db', check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -172,75 +956,338 @@ def api_security():
     
     conn.close()
     
+    status = live_state.status_snapshot()
     return jsonify({
         "events": events,
+        # Dernières erreurs de traitement du lien (mémoire seulement, non enregistrées en base)
+        "processing_errors": live_state.alerts_snapshot(),
         "stats": {
-            "total_messages": system_status["message_count"],
-            "satellite_connected": system_status["satellite_connected"]
+            "total_messages": status["message_count"],
+            "satellite_connected": status["satellite_connected"]
         }
     })
 
-@app.route('/api/charts/temperature')
-def temperature_chart():
-    """Données pour graphique température"""
-    conn = sqlite3.connect('satellite_monitoring.db', check_same_thread=False)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT timestamp, temperature 
-        FROM telemetry 
-        ORDER BY timestamp DESC 
-        LIMIT 50
-    ''')
-    
-    data = cursor.fetchall()
-    conn.close()
-    
-    times = [row[0] for row in data]
-    temps = [row[1] for row in data]
-    
-    trace = go.Scatter(
-        x=list(reversed(times)),
-        y=list(reversed(temps)),
-        mode='lines+markers',
-        name='Temperature',
-        line=dict(color='#FF6B6B', width=2)
-    )
-    
+class ChartCache:
+    """Réponses de graphiques déjà sérialisées, avec ETag, par variante de requête"""
+
+    def __init__(self, size=CHART_CACHE_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, version, body):
+        etag = hashlib.md5(body).hexdigest()
+        with self.lock:
+            self.entries[key] = (version, body, etag)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return body, etag
+
+chart_cache = ChartCache()
+
+def bucket_minmax(t, counts, sums, lows, highs, points):
+    """Buckets de durée égale sur t trié (µs) : temps moyen, moyenne, min et max de chaque bucket
+    non vide. Une ligne peut déjà être un agrégat (count, somme, min, max) : mesure brute ou rollup."""
+    offsets = t - t[0]
+    index = offsets * points // (offsets[-1] + 1)
+    starts = np.flatnonzero(np.diff(index, prepend=-1))
+    n = np.add.reduceat(counts, starts)
+    x = t[0] + (np.add.reduceat(offsets * counts.astype(np.float64), starts) / n).astype(np.int64)
+    return x, np.add.reduceat(sums, starts) / n, np.minimum.reduceat(lows, starts), np.maximum.reduceat(highs, starts)
+
+def lttb(t, v, points):
+    """Largest-Triangle-Three-Buckets : garde dans chaque bucket le point qui forme le plus grand
+    triangle avec le point retenu avant et la moyenne du bucket suivant (pics et creux conservés)"""
+    n = len(t)
+    if points >= n or points < 3:
+        return t, v
+    x = (t - t[0]).astype(np.float64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    counts = np.diff(edges)
+    # Moyenne de chaque bucket, puis le dernier point comme « bucket suivant » du dernier
+    next_x = np.append((np.add.reduceat(x[:n - 1], edges[:-1]) / counts)[1:], x[-1])
+    next_y = np.append((np.add.reduceat(v[:n - 1], edges[:-1]) / counts)[1:], v[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (v[lo:hi] - v[a]) - (x[a] - x[lo:hi]) * (next_y[i] - v[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return t[selected], v[selected]
+
+def rgba(color, alpha):
+    return f"rgba({int(color[1:3], 16)}, {int(color[3:5], 16)}, {int(color[5:7], 16)}, {alpha})"
+
+def chart_rollup(start, end, points):
+    """Résolution d'agrégats au moins aussi fine que les buckets demandés, None s'il faut les mesures brutes"""
+    try:
+        begin = datetime.fromisoformat(start)
+        finish = datetime.fromisoformat(end) if end else datetime.now()
+        width = (finish - begin) / points
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if width >= timedelta(hours=1):
+        return 'hour'
+    if width >= timedelta(minutes=1) and begin >= datetime.now() - timedelta(days=ROLLUP_MINUTE_DAYS):
+        return 'minute'
+    return None
+
+def fetch_chart_rows(field, sensor_ids, start, end, resolution):
+    """Lignes de la plage en tableau NumPy (t, sensor_id, count, sum, min, max), triées par temps :
+    agrégats minute/heure si resolution est donnée, mesures brutes (chaudes et archivées) sinon"""
+    dtype = [('t', 'datetime64[us]'), ('sensor_id', 'O'), ('count', 'i8'),
+             ('sum', 'f8'), ('min', 'f8'), ('max', 'f8')]
+    if resolution is None:
+        query, params = history_query(sensor_ids, (field,), start, end, None, False, None, non_null=True)
+        query = f"SELECT timestamp, sensor_id, 1, {field}, {field}, {field} FROM ({query})"
+    else:
+        table, prefix = ROLLUP_RESOLUTIONS[resolution]
+        query = (f"SELECT bucket, sensor_id, count, {field}_sum, {field}_min, {field}_max FROM {table} "
+                 f"WHERE bucket >= ? AND {field}_sum IS NOT NULL")
+        params = [start[:prefix]]
+        if end:
+            query += " AND bucket <= ?"
+            params.append(end[:prefix])
+        if sensor_ids:
+            query += f" AND sensor_id IN ({', '.join('?' * len(sensor_ids))})"
+            params.extend(sensor_ids)
+        query += " ORDER BY bucket"
+
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        # Conversion directe curseur -> tableau, sans liste de tuples intermédiaire
+        return np.fromiter(conn.execute(query, params), dtype=dtype)
+    finally:
+        conn.close()
+
+def downsampled_traces(field, sensor_ids, start, end, by_sensor, points, method):
+    """Plage réduite par série avec NumPy ; les buckets d'une minute ou plus partent des rollups"""
+    resolution = chart_rollup(start, end, points) if method == 'minmax' else None
+    rows = fetch_chart_rows(field, sensor_ids, start, end, resolution)
+    if not len(rows):
+        return [go.Scatter(x=[], y=[], mode='lines', name=field.capitalize())], 0, resolution
+
+    if by_sensor:
+        groups = [(name, rows['sensor_id'] == name) for name in dict.fromkeys(rows['sensor_id'])]
+    else:
+        groups = [(field.capitalize(), slice(None))]
+
+    traces = []
+    for i, (name, mask) in enumerate(groups):
+        color = CHART_COLORS[i % len(CHART_COLORS)]
+        series = rows[mask]
+        ts, vs = series['t'].astype(np.int64), series['sum']
+        if method == 'minmax' and (resolution is not None or len(ts) > points):
+            ts, vs, low, high = bucket_minmax(ts, series['count'], vs, series['min'], series['max'], points)
+        else:
+            if method == 'lttb':
+                ts, vs = lttb(ts, vs, points)
+            low = high = None
+        x = np.datetime_as_string(ts.astype('datetime64[us]'), unit='ms')
+        # Trace principale en premier : le dashboard y ajoute les mesures temps réel
+        traces.append(go.Scatter(x=x, y=np.round(vs, 3), mode='lines', name=name,
+                                 line=dict(color=color, width=2)))
+        if low is not None:
+            traces.append(go.Scatter(x=x, y=np.round(high, 3), mode='lines', line=dict(width=0),
+                                     showlegend=False, hoverinfo='skip'))
+            traces.append(go.Scatter(x=x, y=np.round(low, 3), mode='lines', line=dict(width=0), fill='tonexty',
+                                     fillcolor=rgba(color, 0.2), name=f'{name} min/max', hoverinfo='skip'))
+    return traces, int(rows['count'].sum()), resolution
+
+def build_chart(field, sensor_ids, start, end, limit, by_sensor, points=CHART_TARGET_POINTS, method='none'):
+    """Interroge la télémétrie et sérialise le graphique Plotly"""
     layout = go.Layout(
-        title='Temperature History',
+        title=f'{field.capitalize()} History',
         paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)',
         font=dict(color='white'),
         xaxis=dict(title='Time', gridcolor='rgba(255,255,255,0.1)'),
-        yaxis=dict(title='°C', gridcolor='rgba(255,255,255,0.1)')
+        yaxis=dict(title=CHART_UNITS[field], gridcolor='rgba(255,255,255,0.1)')
     )
+    if method != 'none':
+        traces, raw_points, resolution = downsampled_traces(field, sensor_ids, start, end, by_sensor, points, method)
+        meta = {'method': method, 'source': resolution or 'raw', 'raw_points': raw_points,
+                'points': max(len(trace.x) for trace in traces)}
+        return json.dumps({'data': traces, 'layout': layout, 'meta': meta},
+                          cls=plotly.utils.PlotlyJSONEncoder).encode()
+
+    query = f"SELECT sensor_id, timestamp, {field} FROM telemetry"
+    where = []
+    params = []
+    if sensor_ids:
+        where.append(f"sensor_id IN ({', '.join('?' * len(sensor_ids))})")
+        params.extend(sensor_ids)
+    if start:
+        where.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        where.append("timestamp <= ?")
+        params.append(end)
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY timestamp DESC LIMIT ?"
+    params.append(limit)
+
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    data = cursor.fetchall()
+    conn.close()
+    data.reverse()
+
+    # Une série par capteur en mode multi-séries, sinon une seule série
+    series = OrderedDict()
+    for sensor_id, timestamp, value in data:
+        name = sensor_id if by_sensor else field.capitalize()
+        times, values = series.setdefault(name, ([], []))
+        times.append(timestamp)
+        values.append(value)
+    if not series:
+        series[field.capitalize()] = ([], [])
+
+    traces = []
+    for i, (name, (times, values)) in enumerate(series.items()):
+        traces.append(go.Scatter(
+            x=times,
+            y=values,
+            mode='lines+markers',
+            name=name,
+            line=dict(color=CHART_COLORS[i % len(CHART_COLORS)], width=2)
+        ))
     
-    return json.dumps({'data': [trace], 'layout': layout}, cls=plotly.utils.PlotlyJSONEncoder)
+    return json.dumps({'data': traces, 'layout': layout}, cls=plotly.utils.PlotlyJSONEncoder).encode()
+
+def local_timestamp(value):
+    """Horodatage ISO ramené à l'heure locale naïve des capteurs (comparé tel quel en SQL) ; ValueError si invalide"""
+    if not value:
+        return value
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return value
+    return parsed.astimezone().replace(tzinfo=None).isoformat()
+
+def chart_response(field):
+    """Sert un graphique depuis le cache ; 304 si le client a déjà la version courante"""
+    sensor_ids = tuple(sorted(request.args.getlist('sensor_id')))
+    try:
+        start = local_timestamp(request.args.get('start'))
+        end = local_timestamp(request.args.get('end'))
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO timestamps"}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', CHART_DEFAULT_POINTS)), CHART_MAX_POINTS))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    by_sensor = request.args.get('by_sensor') == '1' or len(sensor_ids) > 1
+    # Sans plage : les `limit` dernières mesures brutes ; avec une plage : série réduite à `points`
+    method = request.args.get('downsample', 'minmax' if start or end else 'none')
+    if method not in CHART_DOWNSAMPLE_METHODS:
+        return jsonify({"error": f"downsample must be one of {list(CHART_DOWNSAMPLE_METHODS)}"}), 400
+    try:
+        points = max(3, min(int(request.args.get('points', CHART_TARGET_POINTS)), CHART_MAX_POINTS))
+    except ValueError:
+        return jsonify({"error": "points must be an integer"}), 400
+
+    key = (field, sensor_ids, start, end, limit, by_sensor, points, method)
+    version = store.telemetry_version
+    cached = chart_cache.get(key, version)
+    if cached is None:
+        cached = chart_cache.put(key, version, build_chart(field, sensor_ids, start, end, limit, by_sensor,
+                                                           points, method))
+    body, etag = cached
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/charts/temperature')
+def temperature_chart():
+    """Données pour graphique température"""
+    return chart_response('temperature')
+
+@app.route('/api/charts/<field>')
+def field_chart(field):
+    """Graphique d'un champ (temperature, humidity, battery) : sensor_id, by_sensor, start, end, limit,
+    downsample (minmax, lttb, none) et points"""
+    if field not in CHART_UNITS:
+        return jsonify({"error": f"field must be one of {sorted(CHART_UNITS)}"}), 404
+    return chart_response(field)
+
+@app.route('/api/stream')
+def api_stream():
+    """Flux SSE : nouvelles mesures, alertes et statistiques poussées au dashboard"""
+    def stream():
+        q = broker.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while not q.lagging:
+                try:
+                    yield q.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            broker.unsubscribe(q)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def stats_publisher(interval=STATS_PUSH_INTERVAL):
+    """Calcule les statistiques une fois par intervalle pour tous les clients connectés"""
+    while True:
+        time.sleep(interval)
+        if not broker.has_subscribers():
+            continue
+        try:
+            broker.publish('stats', compute_stats())
+        except sqlite3.Error as e:
+            print(f"[Ground] Stats push error: {e}")
 
 @app.route('/api/stats')
 def api_stats():
     """Statistiques système"""
-    conn = sqlite3.connect('satellite_monitoring.db', check_same_thread=False)
+    return jsonify(compute_stats())
+
+def compute_stats():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     cursor = conn.cursor()
     
-    cursor.execute("SELECT COUNT(*) FROM telemetry")
-    total_telemetry = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM security_events WHERE severity = 'HIGH'")
-    high_alerts = cursor.fetchone()[0]
+    # Compteurs et agrégats maintenus à l'écriture : coût indépendant du volume stocké
+    cursor.execute("SELECT name, value FROM stats_counters")
+    counters = dict(cursor.fetchall())
+    total_telemetry = counters.get('telemetry', 0)
+    high_alerts = counters.get('security:HIGH', 0)
     
+    since = (datetime.now() - timedelta(hours=1)).isoformat()[:16]
     cursor.execute('''
-        SELECT AVG(temperature), AVG(humidity), AVG(battery)
-        FROM telemetry 
-        WHERE timestamp > datetime('now', '-1 hour')
-    ''')
+        SELECT SUM(temperature_sum) / SUM(count),
+               SUM(humidity_sum) / SUM(count),
+               SUM(battery_sum) / SUM(count)
+        FROM telemetry_rollup_minute 
+        WHERE bucket >= ?
+    ''', (since,))
     
     avg_data = cursor.fetchone()
     
     conn.close()
     
-    return jsonify({
+    return {
         "telemetry_count": total_telemetry,
         "high_alerts": high_alerts,
         "averages": {
@@ -248,24 +1295,107 @@ def api_stats():
             "humidity": round(avg_data[1], 2) if avg_data[1] else 0,
             "battery": round(avg_data[2], 2) if avg_data[2] else 0
         },
-        "system": system_status
-    })
+        "system": live_state.status_snapshot(),
+        "live": live_state.sizes(),
+        "storage": store.stats()
+    }
+
+@app.route('/api/stats/range')
+def api_stats_range():
+    """Agrégats par minute ou par heure sur une plage de temps"""
+    resolution = request.args.get('resolution', 'hour')
+    if resolution not in ROLLUP_RESOLUTIONS:
+        return jsonify({"error": f"resolution must be one of {sorted(ROLLUP_RESOLUTIONS)}"}), 400
+    table, prefix = ROLLUP_RESOLUTIONS[resolution]
+
+    end = request.args.get('end', datetime.now().isoformat())
+    start_default = datetime.now() - (timedelta(hours=1) if resolution == 'minute' else timedelta(days=1))
+    begin = request.args.get('start', start_default.isoformat())
+    sensor_id = request.args.get('sensor_id')
+
+    query = f'''
+        SELECT bucket, sensor_id, count,
+               temperature_sum, temperature_min, temperature_max,
+               humidity_sum, humidity_min, humidity_max,
+               battery_sum, battery_min, battery_max
+        FROM {table}
+        WHERE bucket >= ? AND bucket <= ?
+    '''
+    params = [begin[:prefix], end[:prefix]]
+    if sensor_id:
+        query += " AND sensor_id = ?"
+        params.append(sensor_id)
+    query += " ORDER BY bucket, sensor_id"
+
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
 
-def start():
+    buckets = []
+    for row in rows:
+        bucket = {"bucket": row[0], "sensor_id": row[1], "count": row[2]}
+        for i, field in enumerate(ROLLUP_FIELDS):
+            total, low, high = row[3 + 3 * i:6 + 3 * i]
+            bucket[field] = {
+                "avg": round(total / row[2], 2) if total is not None and row[2] else None,
+                "min": low,
+                "max": high
+            }
+        buckets.append(bucket)
+
+    return jsonify({"resolution": resolution, "start": begin, "end": end, "buckets": buckets})
+
+@app.route('/metrics')
+def api_metrics():
+    """Compteurs, jauges et histogrammes au format texte Prometheus"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/api/profile')
+def api_profile():
+    """Profil par échantillonnage de tous les threads pendant ?seconds= secondes (5 par défaut)"""
+    try:
+        seconds = float(request.args.get('seconds', 5))
+    except ValueError:
+        return jsonify({"error": "seconds must be a number"}), 400
+    return Response(metrics.profile(seconds), mimetype='text/plain')
+
+def start(ingest_workers=INGEST_WORKERS):
     """Démarre l'application"""
     init_database()
+    store.start()
+    atexit.register(store.stop)
+
+    retention = threading.Thread(target=retention_worker, daemon=True)
+    retention.start()
+
+    publisher = threading.Thread(target=stats_publisher, daemon=True)
+    publisher.start()
     
-    receiver = threading.Thread(target=receive_from_satellite, daemon=True)
-    receiver.start()
+    if ingest_workers > 0:
+        start_ingest_workers(ingest_workers)
+    else:
+        receiver = threading.Thread(target=receive_from_satellite, daemon=True)
+        receiver.start()
     
     print("\n[Ground] Arctic Research Dashboard")
     print(f"[Ground] Dashboard: http://192.168.1.30:8080")
     print("[Ground] APIs:")
     print("  - /api/telemetry     : Latest sensor data")
+    print("  - /api/telemetry/history : Stored readings, cursor pages or CSV/NDJSON export")
     print("  - /api/security      : Security events")
     print("  - /api/stats         : System statistics")
+    print("  - /api/stats/range   : Per-minute/hour rollups (start, end, sensor_id, resolution)")
+    print("  - /api/stream        : Server-sent events (telemetry, security, stats)")
     print("  - /api/charts/temperature : Temperature chart data")
+    print("  - /api/charts/<field>     : Cached chart (sensor_id, by_sensor, start, end, limit, downsample, points)")
+    print("  - /metrics           : Prometheus metrics")
+    print("  - /api/profile       : Sampling profile (seconds)")
     
     app.run(host='0.0.0.0', port=8080, debug=False)
 
-if __name__ == "__main__":
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ground station dashboard")
+    parser.add_argument("--ingest-workers", type=int, default=INGEST_WORKERS,
+                        help="satellite ingest processes (0: receiver thread in the dashboard process)")
+    args = parser.parse_args()
+    start(args.ingest_workers)
@@ -1,9 +1,15 @@
+import os
 import socket
 import json
 import time
 import random
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from cryptography.fernet import Fernet
+import metrics
+from wire_format import WIRE_JSON, WIRE_BINARY, WIRE_COMPACT, WIRE_FORMATS, encode_records, encode_binary_message
 
 SATELLITE_IP = "192.168.1.40"
 SATELLITE_PORT = 5000
@@ -11,47 +17,373 @@ SATELLITE_PORT = 5000
 SECRET_KEY = b'GS****************************ss='  # À remplacer
 cipher = Fernet(SECRET_KEY)
 
-def create_sensor_data(seq):
+SENSOR_ID = "ARCTIC-SENSOR-01"
+SENSOR_LATITUDE = 78.2235
+SENSOR_LONGITUDE = 15.6267
+SEND_INTERVAL = 8
+# Format d'envoi : "json" (historique), "binary" (trame compacte à longueur préfixée)
+# ou "compact" (binaire, lots encodés en deltas et compressés)
+WIRE_FORMAT = WIRE_JSON
+
+# File d'attente disque (store-and-forward) : segments en ajout seul, taille totale plafonnée
+SPOOL_DIR = 'sensor_spool'
+SPOOL_SEGMENT_SIZE = 256 * 1024
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# Mesures par trame chiffrée, trames envoyées par cycle (reste sous le seuil de flood du satellite)
+SEND_BATCH_SIZE = 50
+SEND_BATCH_MIN = 1
+DRAIN_MAX_FRAMES = 5
+
+# Métriques (GET /metrics et /profile sur METRICS_PORT, 0 = désactivé)
+METRICS_IP = "127.0.0.1"
+METRICS_PORT = 0
+READINGS = metrics.counter("sensor_readings_total", "Readings produced")
+FRAMES = metrics.counter("sensor_frames_total", "Encrypted frames sent")
+SEND_FAILURES = metrics.counter("sensor_send_failures_total", "Frames that could not be sent")
+SEND_SECONDS = metrics.histogram("sensor_send_seconds", "Connect and send time per frame")
+SPOOL_PENDING = metrics.gauge("sensor_spool_pending", "Readings waiting in the on-disk spool")
+
+# Mode flotte : connexions simultanées max par processus
+FLEET_MAX_OPEN_CONNECTIONS = 500
+FLEET_CONNECT_TIMEOUT = 5
+
+def create_sensor_data(seq, sensor_id=SENSOR_ID, latitude=SENSOR_LATITUDE, longitude=SENSOR_LONGITUDE):
     return {
-        "sensor_id": "ARCTIC-SENSOR-01",
+        "sensor_id": sensor_id,
         "sequence": seq,
         "timestamp": datetime.now().isoformat(),
         "temperature": round(-15.0 + random.uniform(-5, 5), 2),
         "humidity": round(random.uniform(30, 70), 1),
         "battery": round(random.uniform(80, 100), 1),
-        "latitude": 78.2235,
-        "longitude": 15.6267
+        "latitude": latitude,
+        "longitude": longitude
     }
 
-def send_secure_data():
+def build_message(data, wire_format=WIRE_JSON):
+    """Chiffre une mesure (ou une liste de mesures) et l'enveloppe dans le message attendu par le satellite"""
+    readings = data if isinstance(data, list) else [data]
+    if wire_format == WIRE_JSON:
+        # Une mesure seule garde son encodage d'origine (objet JSON), un lot devient une liste
+        plaintext = json.dumps(readings[0] if len(readings) == 1 else readings).encode()
+    else:
+        plaintext = encode_records(readings, compact=wire_format == WIRE_COMPACT)
+    encrypted = cipher.encrypt(plaintext)
+    # Un lot est signé et horodaté par sa première mesure
+    first = readings[0]
+    return {
+        "sender": first["sensor_id"],
+        "timestamp": first["timestamp"],
+        "encrypted_data": encrypted.decode('latin-1'),
+        "signature": f"SIG_{first['sequence']:06d}"
+    }
+
+def encode_message(data, wire_format=WIRE_FORMAT):
+    message = build_message(data, wire_format)
+    if wire_format in (WIRE_BINARY, WIRE_COMPACT):
+        return encode_binary_message(message)
+    return json.dumps(message).encode()
+
+class SensorSpool:
+    """File d'attente disque du capteur : mesures en lignes JSON dans des segments en ajout seul.
+    La tête (segment, position) est persistée à chaque envoi ; au-delà de max_bytes les plus
+    anciens segments sont supprimés."""
+
+    def __init__(self, path=SPOOL_DIR, segment_size=SPOOL_SEGMENT_SIZE, max_bytes=SPOOL_MAX_BYTES):
+        self.path = path
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        os.makedirs(path, exist_ok=True)
+
+        self.segments = sorted(int(name[:-4]) for name in os.listdir(path) if name.endswith('.seg')) or [0]
+        self.head_offset = 0
+        self._load_head()
+        self._repair_tail()
+        self.size = sum(self._segment_size(index) for index in self.segments)
+        self.pending = sum(self._count(index) for index in self.segments)
+
+    def __len__(self):
+        return self.pending
+
+    def _segment_path(self, index):
+        return os.path.join(self.path, f"{index:08d}.seg")
+
+    def _segment_size(self, index):
+        try:
+            return os.path.getsize(self._segment_path(index))
+        except OSError:
+            return 0
+
+    def _load_head(self):
+        try:
+            with open(os.path.join(self.path, 'head')) as f:
+                index, offset = map(int, f.read().split())
+        except (OSError, ValueError):
+            return
+        # Segments antérieurs à la tête : déjà transmis
+        while len(self.segments) > 1 and self.segments[0] < index:
+            self._remove_segment(self.segments.pop(0))
+        if self.segments[0] == index:
+            self.head_offset = offset
+
+    def _save_head(self):
+        tmp_path = os.path.join(self.path, 'head.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(f"{self.segments[0]} {self.head_offset}")
+        os.replace(tmp_path, os.path.join(self.path, 'head'))
+
+    def _repair_tail(self):
+        """Coupe une dernière ligne incomplète (arrêt pendant une écriture)"""
+        path = self._segment_path(self.segments[-1])
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+') as f:
+            content = f.read()
+            end = content.rfind(b'\n') + 1
+            if end < len(content):
+                f.truncate(end)
+
+    def _remove_segment(self, index):
+        try:
+            os.remove(self._segment_path(index))
+        except FileNotFoundError:
+            pass
+
+    def _scan(self, index, start):
+        """Parcourt les lignes d'un segment : (mesure ou None si illisible, position de fin)"""
+        try:
+            with open(self._segment_path(index), 'rb') as f:
+                f.seek(start)
+                for line in f:
+                    start += len(line)
+                    try:
+                        yield json.loads(line), start
+                    except ValueError:
+                        yield None, start
+        except FileNotFoundError:
+            return
+
+    def _count(self, index):
+        start = self.head_offset if index == self.segments[0] else 0
+        return sum(1 for _ in self._scan(index, start))
+
+    def append(self, data):
+        line = (json.dumps(data) + '\n').encode()
+        if self._segment_size(self.segments[-1]) >= self.segment_size:
+            self.segments.append(self.segments[-1] + 1)
+        with open(self._segment_path(self.segments[-1]), 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.size += len(line)
+        self.pending += 1
+        self._enforce_cap()
+
+    def _enforce_cap(self):
+        while self.size > self.max_bytes and len(self.segments) > 1:
+            lost = self._count(self.segments[0])
+            self.size -= self._segment_size(self.segments[0])
+            self._remove_segment(self.segments.pop(0))
+            self.head_offset = 0
+            self.pending -= lost
+            self.dropped += lost
+            self._save_head()
+            print(f"[IoT] Spool full: dropped {lost} oldest readings")
+
+    def peek(self, max_items):
+        """Jusqu'à max_items mesures depuis la tête : (mesures, position après le lot, lignes lues)"""
+        readings = []
+        consumed = 0
+        position = (self.segments[0], self.head_offset)
+        for index in self.segments:
+            start = self.head_offset if index == self.segments[0] else 0
+            position = (index, start)
+            for data, end in self._scan(index, start):
+                consumed += 1
+                position = (index, end)
+                if data is not None:
+                    readings.append(data)
+                if consumed >= max_items:
+                    return readings, position, consumed
+        return readings, position, consumed
+
+    def commit(self, position, consumed):
+        """Retire de la file les lignes lues par peek, une fois le lot transmis"""
+        index, offset = position
+        while self.segments[0] < index:
+            self.size -= self._segment_size(self.segments[0])
+            self._remove_segment(self.segments.pop(0))
+        self.head_offset = offset
+        self.pending -= consumed
+        self._save_head()
+
+def drain_spool(spool, wire_format=WIRE_FORMAT, host=SATELLITE_IP, port=SATELLITE_PORT,
+                batch_size=SEND_BATCH_SIZE, max_frames=DRAIN_MAX_FRAMES):
+    """Envoie l'arriéré par lots chiffrés ; un lot n'est retiré de la file qu'une fois envoyé.
+    Les trames binaires partent à la suite sur une seule connexion ; un message JSON, délimité
+    par la fermeture, a toujours besoin de la sienne."""
+    frames = 0
+    s = None
+    try:
+        while spool.pending and frames < max_frames:
+            readings, position, consumed = spool.peek(batch_size)
+            if readings:
+                payload = encode_message(readings, wire_format)
+                try:
+                    with SEND_SECONDS.time():
+                        if s is None:
+                            s = socket.socket()
+                            s.settimeout(5)
+                            s.connect((host, port))
+                        s.sendall(payload)
+                        if wire_format == WIRE_JSON:
+                            s.close()
+                            s = None
+                except OSError:
+                    SEND_FAILURES.inc()
+                    raise
+                FRAMES.inc()
+                frames += 1
+            spool.commit(position, consumed)
+            print(f"[IoT] Batch sent: {len(readings)} reading(s), {spool.pending} queued")
+    finally:
+        if s is not None:
+            s.close()
+    return frames
+
+def send_secure_data(wire_format=WIRE_FORMAT, batch_min=SEND_BATCH_MIN, spool_dir=SPOOL_DIR):
     print("[IoT] Starting secure sensor...")
-    print(f"[IoT] Target: {SATELLITE_IP}:{SATELLITE_PORT}")
-    
+    print(f"[IoT] Target: {SATELLITE_IP}:{SATELLITE_PORT} ({wire_format})")
+
+    spool = SensorSpool(spool_dir)
+    SPOOL_PENDING.set_function(spool.__len__)
+    if spool.pending:
+        print(f"[IoT] Spool: {spool.pending} reading(s) waiting from a previous run")
+
     seq = 0
     while True:
+        data = create_sensor_data(seq)
+        spool.append(data)
+        READINGS.inc()
+        print(f"[IoT] #{seq} queued: {data['temperature']}°C")
+        seq += 1
+
+        # Hors passage satellite, les mesures restent sur disque et partent en bloc au retour du lien
+        if spool.pending >= batch_min:
+            try:
+                drain_spool(spool, wire_format)
+            except Exception as e:
+                print(f"[IoT] Link down ({e}), {spool.pending} reading(s) queued")
+
+        time.sleep(SEND_INTERVAL)
+
+class VirtualSensor:
+    """Capteur simulé du mode flotte : identifiant, séquence, cadence et gigue propres"""
+
+    def __init__(self, sensor_id, rate, jitter, wire_format=WIRE_FORMAT):
+        self.sensor_id = sensor_id
+        self.wire_format = wire_format
+        self.interval = 1.0 / rate
+        self.jitter = jitter
+        self.seq = 0
+        self.latitude = round(SENSOR_LATITUDE + random.uniform(-0.5, 0.5), 4)
+        self.longitude = round(SENSOR_LONGITUDE + random.uniform(-0.5, 0.5), 4)
+
+    def next_delay(self):
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def next_payload(self):
+        data = create_sensor_data(self.seq, self.sensor_id, self.latitude, self.longitude)
+        self.seq += 1
+        return encode_message(data, self.wire_format)
+
+async def run_virtual_sensor(sensor, host, port, deadline, slots, stats):
+    # Départs étalés pour ne pas synchroniser toute la flotte
+    await asyncio.sleep(random.uniform(0, sensor.interval))
+    while time.monotonic() < deadline:
+        payload = sensor.next_payload()
+        started = time.perf_counter()
         try:
-            data = create_sensor_data(seq)
-            encrypted = cipher.encrypt(json.dumps(data).encode())
-            message = {
-                "sender": data["sensor_id"],
-                "timestamp": data["timestamp"],
-                "encrypted_data": encrypted.decode('latin-1'),
-                "signature": f"SIG_{seq:06d}"
-            }
+            async with slots:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), FLEET_CONNECT_TIMEOUT)
+                writer.write(payload)
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            stats["sent"] += 1
+            stats["bytes"] += len(payload)
+            elapsed = time.perf_counter() - started
+            stats["send_time"] += elapsed
+            SEND_SECONDS.observe(elapsed)
+            READINGS.inc()
+            FRAMES.inc()
+        except (OSError, asyncio.TimeoutError):
+            stats["errors"] += 1
+            SEND_FAILURES.inc()
+        await asyncio.sleep(sensor.next_delay())
+
+async def run_fleet(sensor_ids, rate, jitter, duration, host, port, wire_format=WIRE_FORMAT):
+    stats = {"sent": 0, "errors": 0, "bytes": 0, "send_time": 0.0}
+    slots = asyncio.Semaphore(FLEET_MAX_OPEN_CONNECTIONS)
+    deadline = time.monotonic() + duration
+    sensors = [VirtualSensor(sensor_id, rate, jitter, wire_format) for sensor_id in sensor_ids]
+    await asyncio.gather(*(run_virtual_sensor(s, host, port, deadline, slots, stats) for s in sensors))
+    return stats
 
-            with socket.socket() as s:
-                s.settimeout(5)
-                s.connect((SATELLITE_IP, SATELLITE_PORT))
-                s.sendall(json.dumps(message).encode())
+def fleet_worker(sensor_ids, rate, jitter, duration, host, port, wire_format=WIRE_FORMAT):
+    return asyncio.run(run_fleet(sensor_ids, rate, jitter, duration, host, port, wire_format))
 
-                print(f"[IoT] #{seq} sent: {data['temperature']}°C")
+def simulate_fleet(count, rate, jitter, duration, processes=1, host=SATELLITE_IP, port=SATELLITE_PORT,
+                   prefix="ARCTIC-SENSOR", wire_format=WIRE_FORMAT):
+    """Lance count capteurs virtuels répartis sur processes boucles asyncio"""
+    sensor_ids = [f"{prefix}-{i:05d}" for i in range(count)]
+    print(f"[IoT] Fleet: {count} sensors x {rate} msg/s (jitter {jitter:.0%}) for {duration}s")
+    print(f"[IoT] Target: {host}:{port} ({processes} process(es), {wire_format})")
+    # Une seule adresse source pour toute la flotte : le satellite doit lever son seuil de flood pour elle
+    print("[IoT] All sensors share one source address: run the satellite with "
+          "--flood-source <address>=inf or --flood-threshold inf")
 
-            seq += 1
-            time.sleep(8)
+    started = time.perf_counter()
+    if processes <= 1:
+        results = [fleet_worker(sensor_ids, rate, jitter, duration, host, port, wire_format)]
+    else:
+        shards = [sensor_ids[i::processes] for i in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(fleet_worker, shard, rate, jitter, duration, host, port, wire_format)
+                       for shard in shards if shard]
+            results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
 
-        except Exception as e:
-            print(f"[IoT] Error: {e}")
-            time.sleep(2)
+    total = {key: sum(r[key] for r in results) for key in results[0]}
+    print(f"[IoT] Fleet done: {total['sent']} sent, {total['errors']} errors in {elapsed:.1f}s "
+          f"({total['sent'] / elapsed:.1f} msg/s, {total['bytes'] / max(total['sent'], 1):.0f} B/msg)")
+    if total["sent"]:
+        print(f"[IoT] Mean send time: {total['send_time'] / total['sent'] * 1000:.2f} ms")
+    return total
 
 if __name__ == "__main__":
-    send_secure_data()
+    parser = argparse.ArgumentParser(description="Arctic IoT sensor / fleet simulator")
+    parser.add_argument("--fleet", type=int, default=0, help="number of virtual sensors (0 = single sensor)")
+    parser.add_argument("--rate", type=float, default=1 / SEND_INTERVAL, help="messages per second per sensor")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative jitter on the send interval")
+    parser.add_argument("--duration", type=float, default=60, help="fleet run time in seconds")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--host", default=SATELLITE_IP)
+    parser.add_argument("--port", type=int, default=SATELLITE_PORT)
+    parser.add_argument("--wire-format", choices=WIRE_FORMATS, default=WIRE_FORMAT)
+    parser.add_argument("--batch-min", type=int, default=SEND_BATCH_MIN,
+                        help="queued readings needed before sending")
+    parser.add_argument("--spool-dir", default=SPOOL_DIR)
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve /metrics and /profile on this port (0 = off)")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        metrics.start_metrics_server(METRICS_IP, args.metrics_port)
+        print(f"[IoT] Metrics: http://{METRICS_IP}:{args.metrics_port}/metrics")
+
+    if args.fleet > 0:
+        simulate_fleet(args.fleet, args.rate, args.jitter, args.duration, args.processes, args.host, args.port,
+                       wire_format=args.wire_format)
+    else:
+        send_secure_data(args.wire_format, args.batch_min, args.spool_dir)
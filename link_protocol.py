@@ -0,0 +1,233 @@
+import socket
+import struct
+import hmac
+import hashlib
+import select
+import threading
+import queue
+import time
+
+# Trame du lien satellite -> sol : longueur sur 4 octets (big-endian) + charge utile
+FRAME_HEADER = struct.Struct('!I')
+MAX_FRAME_SIZE = 1024 * 1024
+# Tampon de réception initial d'un FrameReader (agrandi jusqu'à la taille max d'une trame)
+READ_BUFFER_SIZE = 64 * 1024
+
+UPLINK_POOL_SIZE = 4
+UPLINK_TIMEOUT = 3
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30
+
+
+def derive_link_key(secret_key):
+    """Clé MAC du lien satellite -> sol, dérivée de la clé partagée"""
+    return hmac.new(secret_key, b'satellite-ground-link', hashlib.sha256).digest()
+
+
+def sign_record(link_key, record):
+    return hmac.new(link_key, record, hashlib.sha256).hexdigest()
+
+
+def verify_record(link_key, record, mac):
+    return isinstance(mac, str) and hmac.compare_digest(sign_record(link_key, record), mac)
+
+
+def send_frame(sock, payload):
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def recv_exact(sock, size):
+    """Lit exactement size octets, None si la connexion se ferme avant"""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock, max_size=MAX_FRAME_SIZE):
+    """Lit une trame complète, None en fin de connexion"""
+    header = recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > max_size:
+        raise ValueError(f"Frame too large: {length} bytes")
+    return recv_exact(sock, length)
+
+
+def frame_length(header):
+    return FRAME_HEADER.unpack(header)[0]
+
+
+class FrameReader:
+    """Découpage incrémental d'un flux en trames préfixées par leur longueur.
+    Un seul tampon par connexion, rempli par recv_into (pas de concaténations), lectures
+    partielles et plusieurs trames par connexion.
+
+    header_size / body_length : taille de l'en-tête et fonction en-tête -> longueur du corps
+    (qui lève ValueError sur un en-tête invalide) ; include_header : trame rendue avec son en-tête."""
+
+    def __init__(self, header_size=FRAME_HEADER.size, body_length=frame_length, include_header=False,
+                 max_size=MAX_FRAME_SIZE, buffer_size=READ_BUFFER_SIZE):
+        self.header_size = header_size
+        self.body_length = body_length
+        self.include_header = include_header
+        self.max_size = max_size
+        self.buffer = bytearray(min(buffer_size, header_size + max_size))
+        self.start = 0
+        self.end = 0
+
+    def pending(self):
+        """Octets reçus pas encore rendus dans une trame"""
+        return self.end - self.start
+
+    def _reserve(self, size):
+        """Garantit size octets libres après les données en attente (compactage, puis agrandissement)"""
+        if len(self.buffer) - self.end >= size:
+            return
+        pending = self.end - self.start
+        if self.start:
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+            self.start, self.end = 0, pending
+        if len(self.buffer) - self.end < size:
+            self.buffer.extend(bytes(pending + size - len(self.buffer)))
+
+    def feed(self, data):
+        """Ajoute des octets reçus par ailleurs (flux asyncio)"""
+        self._reserve(len(data))
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def recv_from(self, sock):
+        """Un recv_into dans l'espace libre du tampon ; renvoie le nombre d'octets lus (0 en fin de flux)"""
+        self._reserve(min(READ_BUFFER_SIZE, self.header_size + self.max_size))
+        with memoryview(self.buffer) as view:
+            n = sock.recv_into(view[self.end:])
+        self.end += n
+        return n
+
+    def next_frame(self):
+        """Trame complète suivante du tampon, None s'il en manque une partie"""
+        if self.end - self.start < self.header_size:
+            return None
+        header_end = self.start + self.header_size
+        length = self.body_length(bytes(self.buffer[self.start:header_end]))
+        if length > self.max_size:
+            raise ValueError(f"Frame too large: {length} bytes")
+        frame_end = header_end + length
+        if frame_end > self.end:
+            # Corps incomplet : place réservée d'avance pour la suite
+            self._reserve(frame_end - self.end)
+            return None
+        frame = bytes(self.buffer[self.start if self.include_header else header_end:frame_end])
+        self.start = frame_end
+        if self.start == self.end:
+            self.start = self.end = 0
+        return frame
+
+    def read_frame(self, sock):
+        """Trame suivante lue sur le socket, None en fin de connexion entre deux trames"""
+        while True:
+            frame = self.next_frame()
+            if frame is not None:
+                return frame
+            if not self.recv_from(sock):
+                if self.pending():
+                    raise ValueError(f"Connection closed inside a frame ({self.pending()} bytes pending)")
+                return None
+
+    def frames(self, sock):
+        """Itère sur les trames d'une connexion jusqu'à sa fermeture"""
+        while True:
+            frame = self.read_frame(sock)
+            if frame is None:
+                return
+            yield frame
+
+
+class UplinkPool:
+    """Petit pool de connexions TCP persistantes vers la station sol"""
+
+    def __init__(self, host, port, size=UPLINK_POOL_SIZE, timeout=UPLINK_TIMEOUT,
+                 backoff_initial=BACKOFF_INITIAL, backoff_max=BACKOFF_MAX):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._backoff = backoff_initial
+        self._next_attempt = 0.0
+
+        self.connects = 0
+        self.failures = 0
+
+    def _connect(self):
+        with self._lock:
+            if time.monotonic() < self._next_attempt:
+                raise ConnectionError("Uplink down, waiting before reconnect")
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError:
+            with self._lock:
+                self._next_attempt = time.monotonic() + self._backoff
+                self._backoff = min(self._backoff * 2, self.backoff_max)
+            raise
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        with self._lock:
+            self._backoff = self.backoff_initial
+            self._next_attempt = 0.0
+            self.connects += 1
+        return sock
+
+    @staticmethod
+    def _is_stale(sock):
+        # Le sol n'envoie jamais rien : une socket lisible a été fermée par le pair
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            return bool(readable)
+        except (OSError, ValueError):
+            return True
+
+    def _checkout(self):
+        while True:
+            try:
+                sock = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if not self._is_stale(sock):
+                return sock
+            sock.close()
+
+    def send(self, payload):
+        """Envoie une trame sur une connexion du pool, True si transmise"""
+        with self._slots:
+            for attempt in range(2):
+                try:
+                    sock = self._checkout()
+                except OSError:
+                    self.failures += 1
+                    return False
+                try:
+                    send_frame(sock, payload)
+                except OSError:
+                    sock.close()
+                    continue
+                self._idle.put(sock)
+                return True
+            self.failures += 1
+            return False
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
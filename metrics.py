@@ -0,0 +1,282 @@
+import sys
+import time
+import bisect
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Profileur par échantillonnage : période et profondeur de pile retenue
+PROFILE_INTERVAL = 0.005
+PROFILE_DEPTH = 6
+PROFILE_MAX_SECONDS = 60
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """Série de mesures ; avec des labels, famille de séries créées par labels()"""
+
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=(), labelvalues=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.labelvalues = labelvalues
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, **labels):
+        """Série d'une combinaison de labels (à garder en variable sur les chemins chauds)"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.get(key)
+                if child is None:
+                    child = self._child(key)
+                    self.children[key] = child
+        return child
+
+    def _child(self, key):
+        return type(self)(self.name, self.help, (), key)
+
+    def series(self):
+        if self.labelnames:
+            with self.lock:
+                return [(self.labelnames, child) for child in self.children.values()]
+        return [((), self)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for names, series in self.series():
+            lines.extend(series.samples(names))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self, names):
+        return [f"{self.name}{format_labels(names, self.labelvalues)} {self.value}"]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Valeur lue à l'export (taille d'une file, d'un cache...) plutôt que mise à jour en continu"""
+        self.function = function
+
+    def samples(self, names):
+        value = self.function() if self.function is not None else self.value
+        return [f"{self.name}{format_labels(names, self.labelvalues)} {value}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), labelvalues=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames, labelvalues)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _child(self, key):
+        return Histogram(self.name, self.help, (), key, self.buckets)
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return Timer(self)
+
+    def samples(self, names):
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        names = names + ("le",)
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + ("+Inf",), counts):
+            cumulative += n
+            lines.append(f"{self.name}_bucket{format_labels(names, self.labelvalues + (bound,))} {cumulative}")
+        labels = format_labels(names[:-1], self.labelvalues)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Timer:
+    """with histogram.time(): ... -> durée observée en secondes"""
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, labelnames=(), **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, labelnames, (), **kwargs)
+                self.metrics[name] = metric
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self):
+        """Export au format texte Prometheus"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registre du processus, partagé par tous les modules qui l'importent
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class SamplingProfiler:
+    """Échantillonne la pile de chaque thread à intervalle fixe ; aucun coût quand il ne tourne pas"""
+
+    def __init__(self, interval=PROFILE_INTERVAL, depth=PROFILE_DEPTH):
+        self.interval = interval
+        self.depth = depth
+        self.samples = {}
+        self.total = 0
+
+    def sample(self):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            key = " <- ".join(stack)
+            self.samples[key] = self.samples.get(key, 0) + 1
+            self.total += 1
+
+    def run(self, seconds):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self.sample()
+            time.sleep(self.interval)
+        return self
+
+    def report(self, limit=25):
+        lines = [f"# {self.total} samples, {self.interval * 1000:.1f} ms interval"]
+        for key, n in sorted(self.samples.items(), key=lambda item: -item[1])[:limit]:
+            lines.append(f"{n / max(self.total, 1):6.1%} {n:6d}  {key}")
+        return "\n".join(lines) + "\n"
+
+
+def profile(seconds, limit=25):
+    """Profil de quelques secondes de tous les threads du processus, en texte"""
+    seconds = min(max(float(seconds), 0.1), PROFILE_MAX_SECONDS)
+    return SamplingProfiler().run(seconds).report(limit)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """GET /metrics (Prometheus), GET /profile?seconds=5"""
+
+    registry = REGISTRY
+
+    def send_text(self, status, text, content_type="text/plain; charset=utf-8"):
+        body = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/metrics":
+            self.send_text(200, self.registry.render(), PROMETHEUS_CONTENT_TYPE)
+        elif url.path == "/profile":
+            try:
+                seconds = float(parse_qs(url.query).get("seconds", ["5"])[0])
+            except ValueError:
+                self.send_text(400, "seconds must be a number\n")
+                return
+            self.send_text(200, profile(seconds))
+        else:
+            self.send_text(404, "not found\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host, port, registry=REGISTRY):
+    handler = type("BoundMetricsRequestHandler", (MetricsRequestHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
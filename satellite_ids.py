@@ -1,23 +1,683 @@
+import os
 import socket
 import json
 import time
+import base64
+import struct
 import hashlib
+import asyncio
+import argparse
+import ipaddress
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from cryptography.fernet import Fernet, InvalidToken
+import numpy as np
 import requests
+from link_protocol import UplinkPool, UPLINK_POOL_SIZE, derive_link_key, sign_record
+from wire_format import MAX_MESSAGE_SIZE, decode_records, parse_message, iter_messages, iter_messages_async
+import metrics
+from metrics import MetricsRequestHandler
 
 GROUND_IP = "192.168.1.30"
 GROUND_PORT = 5001
 
+LISTEN_IP = "0.0.0.0"
+LISTEN_PORT = 5000
+
+# Latence simulée du lien satellite (secondes)
+SATELLITE_LATENCY = 0.5
+# File d'attente des connexions non acceptées du serveur série
+SERIAL_BACKLOG = 128
+# Nombre maximal de connexions capteurs traitées simultanément (mode asyncio)
+MAX_CONCURRENT_CONNECTIONS = 200
+# Délai max d'attente du message suivant d'un capteur avant abandon de la connexion
+CLIENT_READ_TIMEOUT = 10
+# Taille max d'une trame capteur ; un capteur peut en envoyer plusieurs par connexion
+CLIENT_MAX_MESSAGE_SIZE = MAX_MESSAGE_SIZE
+
+FLOOD_WINDOW = 10
+FLOOD_THRESHOLD = 15
+# Seuils propres à certaines sources (adresse du capteur -> messages par fenêtre)
+FLOOD_THRESHOLDS = {}
+# Une source sans message depuis FLOOD_IDLE_TIMEOUT secondes est oubliée
+FLOOD_IDLE_TIMEOUT = 60
+
+# Liste de blocage persistante : durée des blocages automatiques (None = permanent)
+BLOCKLIST_PATH = 'ids_blocklist.json'
+BLOCK_TTL = 3600
+
+# Alertes : anneau borné côté satellite, envoyées au sol par lots sur le lien montant
+ALERT_BUFFER_SIZE = 10000
+ALERT_EXPORT_QUEUE = 5000
+ALERT_EXPORT_BATCH = 200
+ALERT_EXPORT_INTERVAL = 1.0
+
+# Métriques du satellite, exposées en GET /metrics sur l'interface d'administration
+CONNECTIONS = metrics.counter("satellite_connections_total", "Sensor connections accepted")
+ACTIVE_CONNECTIONS = metrics.gauge("satellite_active_connections", "Sensor connections being processed")
+MESSAGES = metrics.counter("satellite_messages_total", "Analysed sensor messages by verdict", ("verdict",))
+MESSAGES_ACCEPTED = MESSAGES.labels(verdict="accepted")
+MESSAGES_REJECTED = MESSAGES.labels(verdict="rejected")
+FORWARDS = metrics.counter("satellite_forwards_total", "Messages relayed to the ground by result", ("result",))
+FORWARDS_OK = FORWARDS.labels(result="ok")
+FORWARDS_FAILED = FORWARDS.labels(result="failed")
+ALERTS_TOTAL = metrics.counter("satellite_alerts_total", "IDS alerts by type", ("type",))
+STAGE_SECONDS = metrics.histogram("satellite_stage_seconds", "Processing time per pipeline stage", ("stage",))
+# accept : de l'acceptation de la connexion au premier message complet (attente d'un créneau incluse)
+ACCEPT_SECONDS = STAGE_SECONDS.labels(stage="accept")
+RECV_SECONDS = STAGE_SECONDS.labels(stage="recv")
+DECRYPT_SECONDS = STAGE_SECONDS.labels(stage="decrypt")
+ANALYZE_SECONDS = STAGE_SECONDS.labels(stage="analyze")
+FORWARD_SECONDS = STAGE_SECONDS.labels(stage="forward")
+STATE_SIZE = metrics.gauge("satellite_state_entries", "Entries held by each IDS structure", ("structure",))
+
+# Interface d'administration locale (liste et levée des blocages)
+ADMIN_IP = "127.0.0.1"
+ADMIN_PORT = 5002
+
 # Même clé que IoT
 SECRET_KEY = b'GS****************************ss='
 cipher = Fernet(SECRET_KEY)
+LINK_KEY = derive_link_key(SECRET_KEY)
+
+# Relais vers le sol : "encrypted" transmet le jeton Fernet d'origine,
+# "verified" transmet la mesure déjà déchiffrée sous MAC du lien (pas de second déchiffrement au sol)
+FORWARD_ENCRYPTED = "encrypted"
+FORWARD_VERIFIED = "verified"
+FORWARD_MODE = FORWARD_ENCRYPTED
+# Seuls champs de l'enveloppe capteur relayés au sol (les autres clés du client sont ignorées)
+UPLINK_FIELDS = ("sender", "timestamp", "encrypted_data", "signature")
+
+# Pool de déchiffrement (mode asyncio) : 0 worker = déchiffrement dans la boucle
+CRYPTO_WORKERS = 0
+CRYPTO_BACKEND = "process"
+CRYPTO_BATCH_SIZE = 64
+CRYPTO_BATCH_WAIT = 0.002
+
+# Détection statistique par capteur : EWMA de la moyenne et de la variance de chaque champ
+ANOMALY_FIELDS = ("temperature", "humidity", "battery")
+ANOMALY_ALPHA = 0.1
+ANOMALY_Z_THRESHOLD = 4.0
+# Mesures nécessaires avant d'appliquer le z-score
+ANOMALY_WARMUP = 20
+# Écart-type plancher (évite les z-scores infinis sur un capteur très stable)
+ANOMALY_MIN_STD = {"temperature": 0.5, "humidity": 1.0, "battery": 0.5}
+# Variation maximale par rapport à la dernière mesure acceptée d'un capteur
+ANOMALY_MAX_STEP = {"temperature": 15.0, "humidity": 50.0, "battery": 25.0}
+# Anti-rejeu : fenêtre de séquences par capteur (bitmap), âge max du jeton Fernet à la réception
+# (fenêtre large : les connexions concurrentes livrent les messages d'un capteur dans le désordre)
+REPLAY_WINDOW = 1024
+REPLAY_MAX_AGE = 300
+REPLAY_MAX_SKEW = 60
+REPLAY_MAX_SENSORS = 100000
+
+# Après autant d'anomalies consécutives sur un champ, le nouveau niveau devient la référence
+ANOMALY_RELEARN = 5
+
+def decrypt_record(encrypted_data):
+    """Déchiffre et décode un jeton capteur : (statut, texte clair ou erreur, liste des mesures)"""
+    try:
+        plaintext = cipher.decrypt(encrypted_data.encode('latin-1'))
+        readings = decode_records(plaintext)
+        # Mesures binaires : relayées au sol sous forme JSON
+        decrypted = plaintext.decode('utf-8') if plaintext[:1] in (b'{', b'[') else json.dumps(readings)
+        return "ok", decrypted, readings
+    except InvalidToken:
+        return "invalid_token", None, None
+    except Exception as e:
+        return "error", str(e)[:100], None
+
+def token_timestamp(encrypted_data):
+    """Instant de chiffrement d'un jeton Fernet (authentifié par le déchiffrement)"""
+    header = base64.urlsafe_b64decode(encrypted_data[:12])
+    return struct.unpack('!Q', header[1:9])[0]
+
+def decrypt_batch(tokens):
+    return [decrypt_record(token) for token in tokens]
+
+class CryptoWorkerPool:
+    """Déchiffrement par lots sur plusieurs cœurs, ordre conservé par émetteur
+
+    Chaque émetteur est affecté à une file (hash de son identifiant) servie par un seul
+    worker : les lots d'une file sont traités et rendus dans l'ordre d'arrivée.
+    """
+
+    def __init__(self, workers=CRYPTO_WORKERS, backend=CRYPTO_BACKEND,
+                 batch_size=CRYPTO_BATCH_SIZE, batch_wait=CRYPTO_BATCH_WAIT):
+        self.workers = workers
+        self.backend = backend
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.shards = []
+        self.executors = []
+        self.tasks = []
+        self.batches = 0
+        self.jobs = 0
+
+    def start(self):
+        executor_class = ProcessPoolExecutor if self.backend == "process" else ThreadPoolExecutor
+        for _ in range(self.workers):
+            shard = asyncio.Queue()
+            executor = executor_class(max_workers=1)
+            self.shards.append(shard)
+            self.executors.append(executor)
+            self.tasks.append(asyncio.create_task(self._serve(shard, executor)))
+
+    async def submit(self, sender, encrypted_data):
+        future = asyncio.get_running_loop().create_future()
+        shard = self.shards[hash(str(sender)) % len(self.shards)]
+        shard.put_nowait((encrypted_data, future))
+        return await future
+
+    async def _serve(self, shard, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await shard.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                if shard.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    await asyncio.sleep(remaining)
+                    if shard.empty():
+                        break
+                batch.append(shard.get_nowait())
+
+            tokens = [token for token, _ in batch]
+            try:
+                results = await loop.run_in_executor(executor, decrypt_batch, tokens)
+            except Exception as e:
+                results = [("error", str(e)[:100], None)] * len(batch)
+            self.batches += 1
+            self.jobs += len(batch)
+            # Résolution dans l'ordre de soumission : les analyses reprennent dans cet ordre
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
+        for executor in self.executors:
+            executor.shutdown(wait=False)
+
+class AnomalyEngine:
+    """Détection d'anomalies par capteur : état EWMA dans des tableaux NumPy (une ligne par capteur),
+    lots de mesures évalués en passes vectorisées"""
+
+    def __init__(self, fields=ANOMALY_FIELDS, alpha=ANOMALY_ALPHA, z_threshold=ANOMALY_Z_THRESHOLD,
+                 warmup=ANOMALY_WARMUP, min_std=ANOMALY_MIN_STD, max_step=ANOMALY_MAX_STEP,
+                 relearn=ANOMALY_RELEARN, capacity=1024):
+        self.fields = fields
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.relearn = relearn
+        self.min_std = np.array([min_std[field] for field in fields])
+        self.max_step = np.array([max_step[field] for field in fields])
+
+        self.rows = {}
+        shape = (capacity, len(fields))
+        self.mean = np.zeros(shape)
+        self.var = np.zeros(shape)
+        self.last = np.full(shape, np.nan)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.streak = np.zeros(shape, dtype=np.int64)
+        self.pending = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _row(self, sensor_id):
+        row = self.rows.get(sensor_id)
+        if row is None:
+            row = len(self.rows)
+            if row == len(self.count):
+                self._grow()
+            self.rows[sensor_id] = row
+        return row
+
+    def _grow(self):
+        size = len(self.count) * 2
+        for name, fill in (("mean", 0.0), ("var", 0.0), ("last", np.nan), ("count", 0), ("streak", 0)):
+            current = getattr(self, name)
+            grown = np.full((size, current.shape[1]), fill, dtype=current.dtype)
+            grown[:len(current)] = current
+            setattr(self, name, grown)
+
+    def score(self, readings):
+        """Évalue un lot de mesures ; renvoie [(position dans le lot, champ, motif)]"""
+        if not readings:
+            return []
+        rows = np.array([self._row(str(data.get("sensor_id", ""))) for data in readings])
+        values = np.array([[float(data.get(field, np.nan)) for field in self.fields] for data in readings])
+        if len(set(rows.tolist())) == len(rows):
+            return self._score_pass(np.arange(len(rows)), rows, values)
+
+        # Rang de chaque mesure parmi celles de son capteur : une passe par rang,
+        # ce qui donne le même résultat qu'un traitement mesure par mesure
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        index = np.arange(len(rows))
+        starts = np.ones(len(rows), dtype=bool)
+        starts[1:] = sorted_rows[1:] != sorted_rows[:-1]
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[order] = index - np.maximum.accumulate(np.where(starts, index, 0))
+
+        anomalies = []
+        for r in range(rank.max() + 1):
+            positions = np.nonzero(rank == r)[0]
+            anomalies.extend(self._score_pass(positions, rows[positions], values[positions]))
+        anomalies.sort()
+        return anomalies
+
+    async def score_async(self, readings):
+        """Comme score, les lots soumis pendant une même itération de la boucle étant évalués ensemble"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self.pending:
+            loop.call_soon(self._flush_pending)
+        self.pending.append((readings, future))
+        return await future
+
+    def _flush_pending(self):
+        pending, self.pending = self.pending, []
+        try:
+            anomalies = self.score([data for readings, _ in pending for data in readings])
+        except Exception:
+            # Une mesure illisible ne doit pas faire échouer les autres messages du lot
+            for readings, future in pending:
+                try:
+                    future.set_result(self.score(readings))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        start = 0
+        for readings, future in pending:
+            end = start + len(readings)
+            future.set_result([(position - start, field, reason) for position, field, reason in anomalies
+                               if start <= position < end])
+            start = end
+
+    def _score_pass(self, positions, rows, x):
+        """Une passe sur des capteurs tous différents : alertes puis mise à jour de l'état"""
+        mean = self.mean[rows]
+        var = self.var[rows]
+        count = self.count[rows]
+        last = self.last[rows]
+        valid = ~np.isnan(x)
+
+        with np.errstate(invalid='ignore'):
+            z = np.abs(x - mean) / np.maximum(np.sqrt(var), self.min_std)
+            step = np.abs(x - last)
+            z_alert = valid & (count >= self.warmup) & (z > self.z_threshold)
+            step_alert = valid & ~np.isnan(last) & (step > self.max_step)
+
+        # Les valeurs suspectes ne sont pas apprises : une falsification ne déplace ni la moyenne
+        # ni la référence de variation (le retour à la normale n'est pas signalé).
+        # Un écart qui persiste relearn fois de suite est en revanche pris comme nouveau niveau.
+        anomalous = z_alert | step_alert
+        streak = np.where(anomalous, self.streak[rows] + 1, 0)
+        reset = anomalous & (streak >= self.relearn)
+        learn = valid & ~anomalous
+        first = (learn & (count == 0)) | reset
+        diff = np.where(learn, x - mean, 0.0)
+        increment = self.alpha * diff
+        self.mean[rows] = np.where(first, x, mean + increment)
+        self.var[rows] = np.where(first, 0.0, np.where(learn, (1 - self.alpha) * (var + diff * increment), var))
+        self.count[rows] = np.where(reset, 1, count + learn)
+        self.last[rows] = np.where(learn | reset, x, last)
+        self.streak[rows] = np.where(reset, 0, streak)
+
+        anomalies = []
+        for i, j in zip(*np.nonzero(anomalous)):
+            reason = f"z={z[i, j]:.1f}" if z_alert[i, j] else f"step={step[i, j]:.1f}"
+            anomalies.append((int(positions[i]), self.fields[j], reason))
+        return anomalies
+
+class ReplayWindow:
+    """Anti-rejeu par capteur, comme IPsec : plus haute séquence vue et bitmap des size précédentes.
+    Mémoire constante par capteur (capteurs les moins récents oubliés au-delà de max_sensors)."""
+
+    ACCEPTED = "accepted"
+    RESTARTED = "restarted"
+    REPLAYED = "replayed"
+    TOO_OLD = "too_old"
+
+    def __init__(self, size=REPLAY_WINDOW, max_sensors=REPLAY_MAX_SENSORS):
+        self.size = size
+        self.mask = (1 << size) - 1
+        self.max_sensors = max_sensors
+        # sensor_id -> [plus haute séquence, bitmap, horodatage le plus récent]
+        self.sensors = OrderedDict()
+
+    def check(self, sensor_id, seq, timestamp):
+        """Enregistre la séquence si elle est nouvelle ; renvoie le verdict"""
+        state = self.sensors.get(sensor_id)
+        if state is None:
+            self.sensors[sensor_id] = [seq, 1, timestamp]
+            if len(self.sensors) > self.max_sensors:
+                self.sensors.popitem(last=False)
+            return self.ACCEPTED
+        self.sensors.move_to_end(sensor_id)
+
+        highest, bitmap, latest = state
+        if seq > highest:
+            if timestamp < latest:
+                # Séquence au-delà de la fenêtre mais mesure plus ancienne : message d'avant un redémarrage
+                return self.REPLAYED
+            shift = seq - highest
+            state[0] = seq
+            state[1] = ((bitmap << shift) | 1) & self.mask if shift < self.size else 1
+        else:
+            offset = highest - seq
+            if offset < self.size and not bitmap >> offset & 1:
+                state[1] = bitmap | (1 << offset)
+            elif timestamp > latest:
+                # Séquence déjà passée mais mesure plus récente que tout ce qui a été vu :
+                # le capteur a redémarré sa numérotation
+                state[:] = [seq, 1, timestamp]
+                return self.RESTARTED
+            else:
+                return self.REPLAYED if offset < self.size else self.TOO_OLD
+        if timestamp > latest:
+            state[2] = timestamp
+        return self.ACCEPTED
+
+    def __len__(self):
+        return len(self.sensors)
+
+class SlidingWindowLimiter:
+    """Compteur à fenêtre glissante en O(1) par message : deux créneaux fixes par source"""
+
+    def __init__(self, window=FLOOD_WINDOW, default_limit=FLOOD_THRESHOLD, limits=None,
+                 idle_timeout=FLOOD_IDLE_TIMEOUT):
+        self.window = window
+        self.default_limit = default_limit
+        self.limits = dict(limits or {})
+        self.idle_timeout = max(idle_timeout, 2 * window)
+        # source -> [début du créneau, compte du créneau courant, compte du précédent, dernier message]
+        self.sources = OrderedDict()
+
+    def limit_for(self, key):
+        return self.limits.get(key, self.default_limit)
+
+    def hit(self, key, now=None):
+        """Compte un message ; renvoie (accepté, estimation des messages sur la fenêtre)"""
+        now = time.time() if now is None else now
+        self._evict_idle(now)
+
+        slot_start = now - (now % self.window)
+        entry = self.sources.get(key)
+        if entry is None:
+            entry = self.sources[key] = [slot_start, 0, 0, now]
+        else:
+            self.sources.move_to_end(key)
+            if entry[0] != slot_start:
+                entry[2] = entry[1] if slot_start - entry[0] == self.window else 0
+                entry[1] = 0
+                entry[0] = slot_start
+            entry[3] = now
+
+        # Le créneau précédent compte au prorata de son recouvrement avec la fenêtre
+        overlap = 1 - (now - slot_start) / self.window
+        estimate = entry[2] * overlap + entry[1]
+        if estimate > self.limit_for(key):
+            return False, estimate
+        entry[1] += 1
+        return True, estimate
+
+    def _evict_idle(self, now):
+        # Les sources sont triées par dernier message : seules les plus anciennes sont examinées
+        while self.sources:
+            key, entry = next(iter(self.sources.items()))
+            if now - entry[3] < self.idle_timeout:
+                break
+            self.sources.popitem(last=False)
+
+    def __len__(self):
+        return len(self.sources)
+
+class Blocklist:
+    """Liste de blocage : adresses exactes et préfixes CIDR, avec expiration et sauvegarde disque"""
+
+    def __init__(self, path=BLOCKLIST_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        # cible -> {"expires_at": float ou None, "reason": str}
+        self.exact = {}
+        # (version IP, longueur de préfixe) -> {adresse réseau (int): cible}
+        self.networks = {}
+        self.entries = {}
+        self.load()
+
+    def block(self, target, ttl=None, reason=""):
+        """Bloque une adresse ou un préfixe ; ttl en secondes, None pour un blocage permanent"""
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be a positive number of seconds")
+        network = ipaddress.ip_network(target, strict=False)
+        target = str(network.network_address) if network.num_addresses == 1 else str(network)
+        entry = {"expires_at": time.time() + ttl if ttl is not None else None, "reason": reason}
+        with self.lock:
+            self.entries[target] = entry
+            if network.num_addresses == 1:
+                self.exact[target] = entry
+            else:
+                key = (network.version, network.prefixlen)
+                self.networks.setdefault(key, {})[int(network.network_address)] = target
+            self._save()
+        return target
+
+    def unblock(self, target):
+        try:
+            network = ipaddress.ip_network(target, strict=False)
+        except ValueError:
+            return False
+        target = str(network.network_address) if network.num_addresses == 1 else str(network)
+        with self.lock:
+            if not self._remove(target):
+                return False
+            self._save()
+        return True
+
+    def is_blocked(self, ip):
+        # Cas courant : correspondance exacte, une seule recherche dans un dict
+        entry = self.exact.get(ip)
+        if entry is not None:
+            if entry["expires_at"] is None or entry["expires_at"] > time.time():
+                return True
+            self.unblock(ip)
+        if not self.networks:
+            return False
+
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        value = int(address)
+        with self.lock:
+            for (version, prefixlen), networks in list(self.networks.items()):
+                if version != address.version:
+                    continue
+                shift = address.max_prefixlen - prefixlen
+                target = networks.get((value >> shift) << shift)
+                if target is None:
+                    continue
+                expires_at = self.entries[target]["expires_at"]
+                if expires_at is None or expires_at > time.time():
+                    return True
+                self.unblock(target)
+        return False
+
+    def list_blocks(self):
+        now = time.time()
+        with self.lock:
+            for target in [t for t, e in self.entries.items() if e["expires_at"] and e["expires_at"] <= now]:
+                self._remove(target)
+            return [{"target": t, **e} for t, e in sorted(self.entries.items())]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _remove(self, target):
+        if self.entries.pop(target, None) is None:
+            return False
+        if self.exact.pop(target, None) is None:
+            network = ipaddress.ip_network(target)
+            networks = self.networks.get((network.version, network.prefixlen), {})
+            networks.pop(int(network.network_address), None)
+            if not networks:
+                self.networks.pop((network.version, network.prefixlen), None)
+        return True
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[Satellite] Blocklist not loaded: {e}")
+            return
+        now = time.time()
+        path, self.path = self.path, None
+        for item in saved.get("entries", []):
+            expires_at = item.get("expires_at")
+            if expires_at is not None and expires_at <= now:
+                continue
+            ttl = expires_at - now if expires_at is not None else None
+            self.block(item["target"], ttl, item.get("reason", ""))
+        self.path = path
+        print(f"[Satellite] Blocklist loaded: {len(self.entries)} entries")
+
+    def _save(self):
+        if not self.path:
+            return
+        entries = [{"target": t, **e} for t, e in self.entries.items()]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"entries": entries}, f)
+        os.replace(tmp_path, self.path)
+
+class AlertStore:
+    """Dernières alertes dans un anneau borné, indexées par type et par source,
+    plus une file (bornée elle aussi) des alertes pas encore envoyées au sol"""
+
+    def __init__(self, size=ALERT_BUFFER_SIZE, export_size=ALERT_EXPORT_QUEUE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.next_id = 0
+        # (id, alerte), du plus ancien au plus récent
+        self.ring = deque()
+        # type / source -> ids présents dans l'anneau, dans l'ordre
+        self.by_type = {}
+        self.by_source = {}
+        self.counts = {}
+        self.export = deque(maxlen=export_size)
+        self.export_dropped = 0
+
+    def append(self, alert):
+        with self.lock:
+            if len(self.ring) == self.size:
+                _, oldest = self.ring.popleft()
+                # L'alerte évincée est la plus ancienne de ses deux index
+                self._unindex(self.by_type, oldest["type"])
+                self._unindex(self.by_source, oldest["source"])
+            alert_id = self.next_id
+            self.next_id += 1
+            self.ring.append((alert_id, alert))
+            self.by_type.setdefault(alert["type"], deque()).append(alert_id)
+            self.by_source.setdefault(alert["source"], deque()).append(alert_id)
+            self.counts[alert["type"]] = self.counts.get(alert["type"], 0) + 1
+
+            if len(self.export) == self.export.maxlen:
+                self.export_dropped += 1
+            self.export.append(alert)
+            return alert_id
+
+    @staticmethod
+    def _unindex(index, key):
+        ids = index[key]
+        ids.popleft()
+        if not ids:
+            del index[key]
+
+    def query(self, alert_type=None, source=None, limit=100):
+        """Alertes les plus récentes d'abord, filtrées par type et/ou source"""
+        with self.lock:
+            if not self.ring:
+                return []
+            first_id = self.ring[0][0]
+            if alert_type is None and source is None:
+                return [alert for _, alert in reversed(self.ring)][:limit]
+
+            # Parcours de l'index le plus court, l'autre filtre étant vérifié sur l'alerte
+            candidates = [index.get(key, ()) for index, key in ((self.by_type, alert_type),
+                                                               (self.by_source, source)) if key is not None]
+            ids = min(candidates, key=len)
+            result = []
+            for alert_id in reversed(ids):
+                alert = self.ring[alert_id - first_id][1]
+                if (alert_type is None or alert["type"] == alert_type) and \
+                        (source is None or alert["source"] == source):
+                    result.append(alert)
+                    if len(result) >= limit:
+                        break
+            return result
+
+    def stats(self):
+        with self.lock:
+            return {"buffered": len(self.ring), "total": self.next_id, "by_type": dict(self.counts),
+                    "export_pending": len(self.export), "export_dropped": self.export_dropped}
+
+    def take_export(self, max_items=ALERT_EXPORT_BATCH):
+        with self.lock:
+            return [self.export.popleft() for _ in range(min(max_items, len(self.export)))]
+
+    def requeue_export(self, alerts):
+        """Remet en tête de file un lot non transmis"""
+        with self.lock:
+            free = self.export.maxlen - len(self.export)
+            self.export.extendleft(reversed(alerts[len(alerts) - free:] if free < len(alerts) else alerts))
+
+    def __len__(self):
+        return len(self.ring)
 
 class IntrusionDetectionSystem:
-    def __init__(self):
-        self.message_count = {}
-        self.blocked_ips = []
-        self.alerts = []
+    def __init__(self, listen_port=LISTEN_PORT, ground_ip=GROUND_IP, ground_port=GROUND_PORT,
+                 latency=SATELLITE_LATENCY, max_connections=MAX_CONCURRENT_CONNECTIONS,
+                 blocklist_path=BLOCKLIST_PATH, forward_mode=FORWARD_MODE,
+                 crypto_workers=CRYPTO_WORKERS, crypto_backend=CRYPTO_BACKEND,
+                 max_message_size=CLIENT_MAX_MESSAGE_SIZE, flood_window=FLOOD_WINDOW,
+                 flood_threshold=FLOOD_THRESHOLD, flood_thresholds=None):
+        self.flood_limiter = SlidingWindowLimiter(flood_window, flood_threshold,
+                                                  FLOOD_THRESHOLDS if flood_thresholds is None else flood_thresholds)
+        self.blocklist = Blocklist(blocklist_path)
+        self.anomaly_engine = AnomalyEngine()
+        self.replay_window = ReplayWindow()
+        self.alerts = AlertStore()
+        self.listen_port = listen_port
+        self.forward_mode = forward_mode
+        self.crypto_workers = crypto_workers
+        self.crypto_backend = crypto_backend
+        self.crypto_pool = None
+        self.ground_ip = ground_ip
+        self.ground_port = ground_port
+        self.latency = latency
+        self.max_connections = max_connections
+        self.max_message_size = max_message_size
+        self.uplink = UplinkPool(ground_ip, ground_port, size=UPLINK_POOL_SIZE)
+
+        for structure, sized in (("flood_sources", self.flood_limiter), ("blocklist", self.blocklist),
+                                 ("alerts", self.alerts), ("replay_sensors", self.replay_window),
+                                 ("anomaly_sensors", self.anomaly_engine)):
+            STATE_SIZE.labels(structure=structure).set_function(sized.__len__)
 
     def log_alert(self, alert_type, source_ip, details):
         alert = {
@@ -28,13 +688,70 @@ class IntrusionDetectionSystem:
             "severity": "HIGH" if "ATTACK" in alert_type else "MEDIUM"
         }
         self.alerts.append(alert)
-        
+        ALERTS_TOTAL.labels(type=alert_type).inc()
+
+    def export_alerts(self):
+        """Envoie au sol, par lots signés avec la clé du lien, les alertes en attente"""
+        sent = 0
+        while True:
+            batch = self.alerts.take_export(ALERT_EXPORT_BATCH)
+            if not batch:
+                return sent
+            alerts = json.dumps(batch)
+            payload = json.dumps({"alerts": alerts, "mac": sign_record(LINK_KEY, alerts.encode('utf-8'))})
+            if not self.uplink.send(payload.encode()):
+                self.alerts.requeue_export(batch)
+                return sent
+            sent += len(batch)
+
+    def alert_exporter(self, interval=ALERT_EXPORT_INTERVAL):
+        while True:
+            time.sleep(interval)
+            try:
+                self.export_alerts()
+            except Exception as e:
+                print(f"[Satellite] Alert export error: {e}")
+
+    def start_alert_exporter(self):
+        threading.Thread(target=self.alert_exporter, daemon=True).start()
+
     def analyze_message(self, message, client_ip):
-        """Analyse approfondie du message"""
-        checks = []
+        """Analyse approfondie du message : (valide, contrôles, texte clair vérifié ou None)"""
+        rejected = self.precheck(message, client_ip)
+        if rejected:
+            return rejected + (None,)
+        with DECRYPT_SECONDS.time():
+            result = decrypt_record(message['encrypted_data'])
+        rejected = self.screen_record(message, client_ip, result)
+        if rejected:
+            return rejected + (None,)
+        return self.inspect_record(message, client_ip, result)
 
+    async def analyze_message_async(self, message, client_ip):
+        """Comme analyze_message, le déchiffrement passant par le pool de workers s'il existe"""
+        rejected = self.precheck(message, client_ip)
+        if rejected:
+            return rejected + (None,)
+        with DECRYPT_SECONDS.time():
+            if self.crypto_pool is None:
+                result = decrypt_record(message['encrypted_data'])
+            else:
+                result = await self.crypto_pool.submit(message['sender'], message['encrypted_data'])
+        rejected = self.screen_record(message, client_ip, result)
+        if rejected:
+            return rejected + (None,)
+
+        try:
+            anomalies = await self.anomaly_engine.score_async(result[2])
+        except Exception:
+            # Erreur relevée à nouveau (et journalisée) par inspect_record
+            anomalies = None
+        return self.inspect_record(message, client_ip, result, anomalies)
+
+    def precheck(self, message, client_ip):
+        """Contrôles avant déchiffrement ; renvoie le rejet éventuel"""
         # Vérification basique
-        if client_ip in self.blocked_ips:
+        if self.blocklist.is_blocked(client_ip):
             return False, ["BLOCKED_IP"]
 
         # Vérification structure
@@ -45,37 +762,78 @@ class IntrusionDetectionSystem:
                 return False, ["INVALID_STRUCTURE"]
 
         # Flood detection
-        current_time = time.time()
-        if client_ip not in self.message_count:
-            self.message_count[client_ip] = []
-
-        self.message_count[client_ip] = [
-            t for t in self.message_count[client_ip] 
-            if current_time - t < 10
-        ]
-
-        if len(self.message_count[client_ip]) > 15:
+        allowed, recent = self.flood_limiter.hit(client_ip)
+        if not allowed:
             self.log_alert("FLOOD_ATTACK_DETECTED", client_ip, 
-                          f"{len(self.message_count[client_ip])} messages/10s")
-            self.blocked_ips.append(client_ip)
+                          f"{recent:.0f} messages/{self.flood_limiter.window}s")
+            self.blocklist.block(client_ip, BLOCK_TTL, "FLOOD_ATTACK_DETECTED")
             return False, ["FLOOD_ATTACK"]
 
-        self.message_count[client_ip].append(current_time)
+        return None
+
+    def screen_record(self, message, client_ip, result):
+        """Déchiffrement, fraîcheur et anti-rejeu ; renvoie le verdict si l'analyse s'arrête là"""
+        status, decrypted, readings = result
 
         # Vérification chiffrement
+        if status == "invalid_token":
+            self.log_alert("ENCRYPTION_TAMPERING", client_ip, "Invalid encryption token")
+            return False, ["ENCRYPTION_FAILED"]
+        if status == "error":
+            self.log_alert("PROCESSING_ERROR", client_ip, decrypted)
+            return True, ["PROCESSING_ERROR"]
+
+        # Fraîcheur : instant de chiffrement porté par le jeton (les lots différés sont chiffrés à l'envoi)
+        age = time.time() - token_timestamp(message['encrypted_data'])
+        if age > REPLAY_MAX_AGE or age < -REPLAY_MAX_SKEW:
+            self.log_alert("STALE_MESSAGE", client_ip, f"Token age {age:.0f}s")
+            return False, ["STALE_MESSAGE"]
+
+        # Anti-rejeu : chaque séquence d'un capteur n'est acceptée qu'une fois
+        for data in readings:
+            seq = data.get("sequence") if isinstance(data, dict) else None
+            if not isinstance(seq, int) or not isinstance(data.get("timestamp"), str):
+                continue
+            verdict = self.replay_window.check(str(data.get("sensor_id")), seq, data["timestamp"])
+            if verdict in (ReplayWindow.REPLAYED, ReplayWindow.TOO_OLD):
+                self.log_alert("REPLAY_ATTACK", client_ip,
+                              f"{data.get('sensor_id')} sequence {seq} ({verdict})")
+                return False, ["REPLAY_DETECTED"]
+            if verdict == ReplayWindow.RESTARTED:
+                print(f"[Satellite] {data.get('sensor_id')} restarted its sequence at {seq}")
+
+        return None
+
+    def inspect_record(self, message, client_ip, result, anomalies=None):
+        """Contrôles sur les mesures déchiffrées (résultat de decrypt_record, déjà passé par screen_record) ;
+        anomalies : résultat déjà calculé de AnomalyEngine.score, sinon évalué ici.
+        Renvoie aussi le texte clair déchiffré, que forward_to_ground relaie tel quel en mode verified"""
+        checks = []
+        status, decrypted, readings = result
+
         try:
-            encrypted = message['encrypted_data'].encode('latin-1')
-            decrypted = cipher.decrypt(encrypted).decode('utf-8')
-            data = json.loads(decrypted)
             checks.append("DECRYPTION_OK")
 
-            # Vérification données
-            temp = data.get("temperature", 0)
-            if temp < -50 or temp > 50:
-                self.log_alert("DATA_TAMPERING", client_ip, f"Temp: {temp}°C")
-                checks.append("DATA_ANOMALY")
+            # Vérification données (chaque mesure d'un lot)
+            for data in readings:
+                temp = data.get("temperature", 0)
+                if temp < -50 or temp > 50:
+                    self.log_alert("DATA_TAMPERING", client_ip, f"Temp: {temp}°C")
+                    if "DATA_ANOMALY" not in checks:
+                        checks.append("DATA_ANOMALY")
+
+            # Écart au comportement habituel du capteur (z-score EWMA, variation brusque)
+            if anomalies is None:
+                anomalies = self.anomaly_engine.score(readings)
+            for position, field, reason in anomalies:
+                data = readings[position]
+                self.log_alert("DATA_TAMPERING", client_ip,
+                              f"{data.get('sensor_id')} {field}: {data.get(field)} ({reason})")
+                if "DATA_ANOMALY" not in checks:
+                    checks.append("DATA_ANOMALY")
 
-            # Vérification séquence
+            # Vérification séquence (signée sur la première mesure d'un lot)
+            data = readings[0]
             if "sequence" in data:
                 expected_sig = f"SIG_{data['sequence']:06d}"
                 if message['signature'] != expected_sig:
@@ -83,70 +841,297 @@ class IntrusionDetectionSystem:
                                   f"Expected {expected_sig}, got {message['signature']}")
                     checks.append("SIGNATURE_INVALID")
 
-        except InvalidToken:
-            self.log_alert("ENCRYPTION_TAMPERING", client_ip, "Invalid encryption token")
-            return False, ["ENCRYPTION_FAILED"]
         except Exception as e:
             self.log_alert("PROCESSING_ERROR", client_ip, str(e)[:100])
             checks.append("PROCESSING_ERROR")
 
-        return True, checks
+        return True, checks, decrypted
     
-    def forward_to_ground(self, message):
-        try:
-            with socket.socket() as s:
-                s.settimeout(3)
-                s.connect((GROUND_IP, GROUND_PORT))
-                s.sendall(json.dumps(message).encode())
-                return True
-        except:
-            return False
+    def build_uplink_payload(self, message, record=None):
+        """Enveloppe relayée, reconstruite à partir de UPLINK_FIELDS ; record : texte clair issu d'un
+        déchiffrement réussi (analyze_message), seul signé avec la clé du lien"""
+        envelope = {k: message[k] for k in UPLINK_FIELDS if k in message}
+        if self.forward_mode == FORWARD_VERIFIED and record is not None:
+            del envelope["encrypted_data"]
+            envelope["record"] = record
+            envelope["mac"] = sign_record(LINK_KEY, record.encode('utf-8'))
+        return json.dumps(envelope).encode()
+
+    def forward_to_ground(self, message, record=None):
+        """Relaie le message sur une connexion persistante du pool"""
+        with FORWARD_SECONDS.time():
+            try:
+                sent = self.uplink.send(self.build_uplink_payload(message, record))
+            except Exception:
+                sent = False
+        (FORWARDS_OK if sent else FORWARDS_FAILED).inc()
+        return sent
     
+    def parse_client_message(self, data, client_ip):
+        """Trame reçue -> enveloppe ; None si le corps est invalide (la connexion continue)"""
+        try:
+            message = parse_message(data)
+        except json.JSONDecodeError:
+            print("[Satellite] Invalid JSON - rejected")
+            return None
+        except ValueError as e:
+            print(f"[Satellite] Malformed message - rejected: {e}")
+            return None
+        print(f"\n[Satellite] From {client_ip}: {message.get('sender', 'Unknown')}")
+        return message
+
+    def report_verdict(self, valid, checks):
+        (MESSAGES_ACCEPTED if valid else MESSAGES_REJECTED).inc()
+        for check in checks:
+            print(f"[Satellite] Check: {check}")
+        if not valid:
+            print(f"[Satellite] Message rejected")
+        return valid
+
     def start(self):
+        """Boucle série : une connexion capteur à la fois"""
         print("[Satellite] Intrusion Detection System starting...")
-        print(f"[Satellite] Listening: 0.0.0.0:5000")
-        print(f"[Satellite] Forwarding to: {GROUND_IP}:{GROUND_PORT}")
+        print(f"[Satellite] Listening: {LISTEN_IP}:{self.listen_port}")
+        print(f"[Satellite] Forwarding to: {self.ground_ip}:{self.ground_port}")
 
         with socket.socket() as server:
-            server.bind(('0.0.0.0', 5000))
-            server.listen(10)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((LISTEN_IP, self.listen_port))
+            server.listen(SERIAL_BACKLOG)
 
             while True:
                 try:
                     client, addr = server.accept()
+                    accepted = time.perf_counter()
+                    CONNECTIONS.inc()
                     client_ip = addr[0]
+                    client.settimeout(CLIENT_READ_TIMEOUT)
+                except Exception as e:
+                    print(f"[Satellite] Error: {e}")
+                    continue
+
+                with client:
+                    try:
+                        self.serve_connection(client, client_ip, accepted)
+                    except socket.timeout:
+                        print(f"[Satellite] Read timeout from {client_ip}")
+                    except ValueError as e:
+                        # En-tête invalide : flux désynchronisé, connexion abandonnée
+                        print(f"[Satellite] Malformed stream - closed: {e}")
+                    except Exception as e:
+                        print(f"[Satellite] Error: {e}")
 
-                    data = client.recv(4096).decode('utf-8')
-                    message = json.loads(data)
+    def serve_connection(self, client, client_ip, accepted):
+        """Messages successifs d'une connexion (mode série)"""
+        messages = iter_messages(client, self.max_message_size)
+        while True:
+            with RECV_SECONDS.time():
+                data = next(messages, None)
+            if data is None:
+                return
+            if accepted is not None:
+                ACCEPT_SECONDS.observe(time.perf_counter() - accepted)
+                accepted = None
+            message = self.parse_client_message(data, client_ip)
+            if message is None:
+                continue
 
-                    print(f"\n[Satellite] From {client_ip}: {message.get('sender', 'Unknown')}")
+            with ANALYZE_SECONDS.time():
+                valid, checks, record = self.analyze_message(message, client_ip)
+            if not self.report_verdict(valid, checks):
+                continue
 
-                    valid, checks = self.analyze_message(message, client_ip)
+            # Latence satellite
+            time.sleep(self.latency)
 
-                    for check in checks:
-                        print(f"[Satellite] Check: {check}")
+            # Transmission
+            if self.forward_to_ground(message, record):
+                print("[Satellite] Forwarded successfully")
+            else:
+                print("[Satellite] Forwarding failed")
 
-                    if not valid:
-                        print(f"[Satellite] Message rejected")
-                        client.close()
+    async def handle_client(self, reader, writer):
+        """Traite une connexion capteur sans bloquer les autres"""
+        accepted = time.perf_counter()
+        client_ip = writer.get_extra_info('peername')[0]
+        loop = asyncio.get_running_loop()
+        CONNECTIONS.inc()
+
+        async with self.connection_slots:
+            ACTIVE_CONNECTIONS.inc()
+            messages = iter_messages_async(reader, self.max_message_size)
+            try:
+                while True:
+                    try:
+                        with RECV_SECONDS.time():
+                            data = await asyncio.wait_for(messages.__anext__(), CLIENT_READ_TIMEOUT)
+                    except StopAsyncIteration:
+                        break
+                    if accepted is not None:
+                        ACCEPT_SECONDS.observe(time.perf_counter() - accepted)
+                        accepted = None
+                    message = self.parse_client_message(data, client_ip)
+                    if message is None:
+                        continue
+
+                    with ANALYZE_SECONDS.time():
+                        valid, checks, record = await self.analyze_message_async(message, client_ip)
+                    if not self.report_verdict(valid, checks):
                         continue
 
-                    # Latence satellite
-                    taime.sleep(0.5)
+                    # Latence satellite, propre à chaque message
+                    await asyncio.sleep(self.latency)
 
-                    # Transmission
-                    if self.forward_to_ground(message):
+                    # Transmission (socket bloquant, exécuté hors de la boucle)
+                    if await loop.run_in_executor(None, self.forward_to_ground, message, record):
                         print("[Satellite] Forwarded successfully")
                     else:
                         print("[Satellite] Forwarding failed")
 
-                    client.close()
+            except asyncio.TimeoutError:
+                print(f"[Satellite] Read timeout from {client_ip}")
+            except ValueError as e:
+                # En-tête invalide : flux désynchronisé, connexion abandonnée
+                print(f"[Satellite] Malformed stream - closed: {e}")
+            except Exception as e:
+                print(f"[Satellite] Error: {e}")
+            finally:
+                ACTIVE_CONNECTIONS.dec()
+                writer.close()
 
-                except json.JSONDecodeError:
-                    print("[Satellite] Invalid JSON - rejected")
-                except Exception as e:
-                    print(f"[Satellite] Error: {e}")
+    async def start_async(self):
+        """Serveur asyncio : connexions capteurs traitées en parallèle"""
+        print("[Satellite] Intrusion Detection System starting (asyncio)...")
+        print(f"[Satellite] Listening: {LISTEN_IP}:{self.listen_port}")
+        print(f"[Satellite] Forwarding to: {self.ground_ip}:{self.ground_port}")
+        print(f"[Satellite] Max concurrent connections: {self.max_connections}")
+
+        self.connection_slots = asyncio.Semaphore(self.max_connections)
+        if self.crypto_workers > 0:
+            self.crypto_pool = CryptoWorkerPool(self.crypto_workers, self.crypto_backend)
+            self.crypto_pool.start()
+            print(f"[Satellite] Crypto workers: {self.crypto_workers} ({self.crypto_backend})")
+        server = await asyncio.start_server(
+            self.handle_client, LISTEN_IP, self.listen_port,
+            reuse_address=True, backlog=self.max_connections
+        )
+        async with server:
+            await server.serve_forever()
+
+class AdminRequestHandler(MetricsRequestHandler):
+    """API d'administration : GET/POST /blocks, DELETE /blocks?target=<ip ou cidr>,
+    GET /alerts?type=&source=&limit=, GET /metrics et GET /profile?seconds= (voir metrics.py)"""
+
+    ids = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/blocks":
+            self.send_json(200, {"blocks": self.ids.blocklist.list_blocks()})
+        elif url.path == "/alerts":
+            # /alerts?type=&source=&limit=
+            query = parse_qs(url.query)
+            try:
+                limit = int(query.get("limit", ["100"])[0])
+            except ValueError:
+                self.send_json(400, {"error": "limit must be an integer"})
+                return
+            alerts = self.ids.alerts.query(query.get("type", [None])[0], query.get("source", [None])[0], limit)
+            self.send_json(200, {"alerts": alerts, "stats": self.ids.alerts.stats()})
+        else:
+            super().do_GET()
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/blocks":
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("body must be a JSON object")
+            if not isinstance(body.get("target"), str):
+                raise ValueError("target must be an address or CIDR string")
+            ttl = body.get("ttl")
+            if ttl is not None and (isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl <= 0):
+                raise ValueError("ttl must be a positive number of seconds")
+            target = self.ids.blocklist.block(body["target"], ttl, str(body.get("reason", "manual")))
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        self.send_json(201, {"blocked": target})
+
+    def do_DELETE(self):
+        url = urlparse(self.path)
+        target = parse_qs(url.query).get("target", [None])[0]
+        if url.path != "/blocks" or not target:
+            self.send_json(400, {"error": "usage: DELETE /blocks?target=<ip or cidr>"})
+        elif self.ids.blocklist.unblock(target):
+            self.send_json(200, {"unblocked": target})
+        else:
+            self.send_json(404, {"error": f"{target} is not blocked"})
+
+def start_admin_server(ids, host=ADMIN_IP, port=ADMIN_PORT):
+    handler = type("BoundAdminRequestHandler", (AdminRequestHandler,), {"ids": ids})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[Satellite] Admin API: http://{host}:{server.server_address[1]}/blocks")
+    return server
+
+def flood_override(value):
+    """Option --flood-source ADRESSE=SEUIL (seuil propre à une source)"""
+    source, sep, limit = value.rpartition("=")
+    try:
+        limit = float(limit)
+    except ValueError:
+        limit = None
+    if not sep or not source or limit is None or not limit >= 0:
+        raise argparse.ArgumentTypeError(f"expected ADDRESS=MESSAGES, got {value!r}")
+    return source, limit
 
 if __name__ == "__main__":
-    ids = IntrusionDetectionSystem()
-    ids.start()
+    parser = argparse.ArgumentParser(description="Satellite IDS relay")
+    parser.add_argument("--mode", choices=["serial", "async"], default="serial")
+    parser.add_argument("--max-connections", type=int, default=MAX_CONCURRENT_CONNECTIONS)
+    parser.add_argument("--latency", type=float, default=SATELLITE_LATENCY)
+    parser.add_argument("--admin-port", type=int, default=ADMIN_PORT)
+    parser.add_argument("--forward-mode", choices=[FORWARD_ENCRYPTED, FORWARD_VERIFIED], default=FORWARD_MODE)
+    # Pool de déchiffrement : mode asyncio uniquement
+    parser.add_argument("--crypto-workers", type=int, default=None)
+    parser.add_argument("--crypto-backend", choices=["process", "thread"], default=None)
+    parser.add_argument("--max-message-size", type=int, default=CLIENT_MAX_MESSAGE_SIZE)
+    parser.add_argument("--flood-window", type=float, default=FLOOD_WINDOW)
+    # "inf" désactive la détection de flood (tests de charge depuis une seule adresse)
+    parser.add_argument("--flood-threshold", type=float, default=FLOOD_THRESHOLD)
+    parser.add_argument("--flood-source", type=flood_override, action="append", default=[],
+                        metavar="ADDRESS=MESSAGES", help="per-source threshold, repeatable")
+    args = parser.parse_args()
+    if args.mode != "async" and (args.crypto_workers is not None or args.crypto_backend is not None):
+        parser.error("--crypto-workers and --crypto-backend require --mode async")
+    if not 0 < args.flood_window < float('inf'):
+        parser.error("--flood-window must be positive")
+    if not args.flood_threshold >= 0:
+        parser.error("--flood-threshold must not be negative")
+
+    crypto_workers = CRYPTO_WORKERS if args.crypto_workers is None else args.crypto_workers
+
+    ids = IntrusionDetectionSystem(latency=args.latency, max_connections=args.max_connections,
+                                   forward_mode=args.forward_mode, crypto_workers=crypto_workers,
+                                   crypto_backend=args.crypto_backend or CRYPTO_BACKEND,
+                                   max_message_size=args.max_message_size,
+                                   flood_window=args.flood_window, flood_threshold=args.flood_threshold,
+                                   flood_thresholds={**FLOOD_THRESHOLDS, **dict(args.flood_source)})
+    start_admin_server(ids, port=args.admin_port)
+    ids.start_alert_exporter()
+    if args.mode == "async":
+        asyncio.run(ids.start_async())
+    else:
+        ids.start()
@@ -0,0 +1,340 @@
+import json
+import zlib
+import base64
+import struct
+from datetime import datetime, timedelta
+from link_protocol import FrameReader, recv_exact
+
+# Formats de message capteur -> satellite, reconnus par le premier octet :
+# '{' pour l'ancien JSON, WIRE_MAGIC pour le format binaire.
+# "compact" : enveloppe binaire, lots encodés en deltas par colonne puis compressés
+WIRE_JSON = "json"
+WIRE_BINARY = "binary"
+WIRE_COMPACT = "compact"
+WIRE_FORMATS = (WIRE_JSON, WIRE_BINARY, WIRE_COMPACT)
+
+WIRE_MAGIC = b'IW'
+WIRE_VERSION = 1
+MAX_MESSAGE_SIZE = 64 * 1024
+
+# En-tête : magic, version, longueur du corps
+WIRE_HEADER = struct.Struct('!2sBI')
+# Enveloppe v1 : horodatage (µs), longueurs de sender, signature et jeton, puis ces trois champs
+ENVELOPE_V1 = struct.Struct('!qBBH')
+# Mesure chiffrée v1 : tag, séquence, horodatage (µs), température (1/100 °C),
+# humidité et batterie (1/10 %), latitude et longitude (1e-7 degré), puis sensor_id
+RECORD_TAG = 0x01
+RECORD_V1 = struct.Struct('!BIqiHHii')
+# Lot v1 : tag, nombre de mesures, puis chaque mesure v1 précédée de sa longueur
+BATCH_TAG = 0x02
+BATCH_HEADER = struct.Struct('!BH')
+BATCH_ITEM = struct.Struct('!H')
+# Lot compact : tag puis zlib(nombre, table des sensor_id, colonne des index,
+# colonnes des champs v1 en deltas successifs), entiers en varint zigzag
+COMPACT_TAG = 0x03
+COMPACT_COLUMNS = 7
+COMPACT_MAX_SIZE = 1024 * 1024
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def timestamp_to_us(timestamp):
+    return (datetime.fromisoformat(timestamp) - EPOCH) // timedelta(microseconds=1)
+
+
+def us_to_timestamp(us):
+    return (EPOCH + timedelta(microseconds=us)).isoformat()
+
+
+def scaled_fields(data):
+    """Champs numériques d'une mesure en entiers à l'échelle du format v1"""
+    return (
+        data["sequence"],
+        timestamp_to_us(data["timestamp"]),
+        round(data["temperature"] * 100),
+        round(data["humidity"] * 10),
+        round(data["battery"] * 10),
+        round(data["latitude"] * 10**7),
+        round(data["longitude"] * 10**7),
+    )
+
+
+def build_reading(sensor_id, fields):
+    seq, ts, temp, humidity, battery, lat, lon = fields
+    return {
+        "sensor_id": sensor_id,
+        "sequence": seq,
+        "timestamp": us_to_timestamp(ts),
+        "temperature": temp / 100,
+        "humidity": humidity / 10,
+        "battery": battery / 10,
+        "latitude": lat / 10**7,
+        "longitude": lon / 10**7
+    }
+
+
+def encode_record(data):
+    """Mesure capteur -> texte clair binaire à chiffrer"""
+    return RECORD_V1.pack(RECORD_TAG, *scaled_fields(data)) + data["sensor_id"].encode('utf-8')
+
+
+def decode_record(plaintext):
+    """Texte clair déchiffré (JSON ou binaire) -> mesure"""
+    if plaintext[:1] != bytes([RECORD_TAG]):
+        return json.loads(plaintext)
+    if len(plaintext) < RECORD_V1.size:
+        raise ValueError("Truncated binary record")
+    fields = RECORD_V1.unpack_from(plaintext)[1:]
+    return build_reading(plaintext[RECORD_V1.size:].decode('utf-8'), fields)
+
+
+def put_varint(out, value):
+    """Entier signé en varint zigzag (7 bits par octet)"""
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def get_varint(buf, offset):
+    result = shift = 0
+    while True:
+        if shift > 63:
+            raise ValueError("Varint too long")
+        byte = buf[offset]
+        offset += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    value = result >> 1 if not result & 1 else -(result >> 1) - 1
+    return value, offset
+
+
+def encode_compact(readings):
+    """Lot -> texte clair compact : les champs constants ou réguliers ne coûtent presque plus rien"""
+    out = bytearray()
+    put_varint(out, len(readings))
+
+    sensor_ids = list(dict.fromkeys(data["sensor_id"] for data in readings))
+    put_varint(out, len(sensor_ids))
+    for sensor_id in sensor_ids:
+        encoded = sensor_id.encode('utf-8')
+        put_varint(out, len(encoded))
+        out += encoded
+    index = {sensor_id: i for i, sensor_id in enumerate(sensor_ids)}
+    for data in readings:
+        put_varint(out, index[data["sensor_id"]])
+
+    rows = [scaled_fields(data) for data in readings]
+    for column in zip(*rows):
+        previous = 0
+        for value in column:
+            put_varint(out, value - previous)
+            previous = value
+    return bytes([COMPACT_TAG]) + zlib.compress(bytes(out), 9)
+
+
+def decode_compact(plaintext):
+    decompressor = zlib.decompressobj()
+    buf = decompressor.decompress(plaintext[1:], COMPACT_MAX_SIZE)
+    if decompressor.unconsumed_tail or not decompressor.eof:
+        raise ValueError("Compact batch too large or truncated")
+
+    count, offset = get_varint(buf, 0)
+    id_count, offset = get_varint(buf, offset)
+    sensor_ids = []
+    for _ in range(id_count):
+        length, offset = get_varint(buf, offset)
+        sensor_ids.append(buf[offset:offset + length].decode('utf-8'))
+        offset += length
+    indexes = []
+    for _ in range(count):
+        i, offset = get_varint(buf, offset)
+        indexes.append(i)
+
+    columns = []
+    for _ in range(COMPACT_COLUMNS):
+        column = []
+        value = 0
+        for _ in range(count):
+            delta, offset = get_varint(buf, offset)
+            value += delta
+            column.append(value)
+        columns.append(column)
+    if offset != len(buf):
+        raise ValueError("Inconsistent compact batch")
+    return [build_reading(sensor_ids[i], fields) for i, fields in zip(indexes, zip(*columns))]
+
+
+def encode_records(readings, compact=False):
+    """Une mesure ou un lot de mesures -> texte clair binaire à chiffrer"""
+    if len(readings) == 1:
+        return encode_record(readings[0])
+    if compact:
+        return encode_compact(readings)
+    parts = [BATCH_HEADER.pack(BATCH_TAG, len(readings))]
+    for data in readings:
+        record = encode_record(data)
+        parts.append(BATCH_ITEM.pack(len(record)))
+        parts.append(record)
+    return b''.join(parts)
+
+
+def decode_records(plaintext):
+    """Texte clair déchiffré -> liste des mesures (mesure seule ou lot, JSON ou binaire)"""
+    tag = plaintext[:1]
+    if tag == bytes([BATCH_TAG]):
+        _, count = BATCH_HEADER.unpack_from(plaintext)
+        offset = BATCH_HEADER.size
+        readings = []
+        for _ in range(count):
+            (length,) = BATCH_ITEM.unpack_from(plaintext, offset)
+            offset += BATCH_ITEM.size
+            readings.append(decode_record(plaintext[offset:offset + length]))
+            offset += length
+        if offset != len(plaintext):
+            raise ValueError("Inconsistent binary batch")
+    elif tag == bytes([COMPACT_TAG]):
+        readings = decode_compact(plaintext)
+    elif tag == bytes([RECORD_TAG]):
+        readings = [decode_record(plaintext)]
+    else:
+        data = json.loads(plaintext)
+        readings = data if isinstance(data, list) else [data]
+    if not readings:
+        raise ValueError("Empty batch")
+    return readings
+
+
+def encode_binary_message(message):
+    """Enveloppe capteur (sender, timestamp, encrypted_data, signature) -> trame binaire"""
+    sender = message["sender"].encode('utf-8')
+    signature = message["signature"].encode('utf-8')
+    # Jeton Fernet transmis en binaire brut plutôt qu'en base64
+    token = base64.urlsafe_b64decode(message["encrypted_data"])
+    body = ENVELOPE_V1.pack(timestamp_to_us(message["timestamp"]), len(sender), len(signature),
+                            len(token)) + sender + signature + token
+    return WIRE_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, len(body)) + body
+
+
+def check_header(header, max_size=MAX_MESSAGE_SIZE):
+    """Valide un en-tête binaire et renvoie la longueur du corps"""
+    magic, version, length = WIRE_HEADER.unpack(header)
+    if magic != WIRE_MAGIC:
+        raise ValueError("Bad wire magic")
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire version: {version}")
+    if length > max_size:
+        raise ValueError(f"Message too large: {length} bytes")
+    return length
+
+
+def decode_binary_message(data):
+    length = check_header(data[:WIRE_HEADER.size])
+    body = data[WIRE_HEADER.size:]
+    if len(body) != length or length < ENVELOPE_V1.size:
+        raise ValueError("Truncated binary message")
+
+    ts, sender_len, signature_len, token_len = ENVELOPE_V1.unpack_from(body)
+    offset = ENVELOPE_V1.size
+    if offset + sender_len + signature_len + token_len != length:
+        raise ValueError("Inconsistent binary envelope")
+    sender = body[offset:offset + sender_len]
+    offset += sender_len
+    signature = body[offset:offset + signature_len]
+    offset += signature_len
+    token = body[offset:]
+    return {
+        "sender": sender.decode('utf-8'),
+        "timestamp": us_to_timestamp(ts),
+        "encrypted_data": base64.urlsafe_b64encode(token).decode('ascii'),
+        "signature": signature.decode('utf-8')
+    }
+
+
+def parse_message(data):
+    """Message complet reçu d'un capteur -> enveloppe au format JSON habituel"""
+    if data[:len(WIRE_MAGIC)] == WIRE_MAGIC:
+        return decode_binary_message(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def recv_message(sock, max_size=MAX_MESSAGE_SIZE):
+    """Lit un seul message entier (corps annoncé en binaire, jusqu'à la fermeture en JSON).
+    Sert au chemin JSON historique (un message par connexion) du lien sol ; les capteurs passent par iter_messages."""
+    first = sock.recv(1)
+    if not first:
+        return b''
+    if first == WIRE_MAGIC[:1]:
+        rest = recv_exact(sock, WIRE_HEADER.size - 1)
+        if rest is None:
+            raise ValueError("Truncated binary header")
+        header = first + rest
+        body = recv_exact(sock, check_header(header, max_size))
+        if body is None:
+            raise ValueError("Truncated binary message")
+        return header + body
+
+    data = bytearray(first)
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return bytes(data)
+        data += chunk
+        if len(data) > max_size:
+            raise ValueError(f"Message too large: more than {max_size} bytes")
+
+
+def message_reader(max_size=MAX_MESSAGE_SIZE):
+    """Découpeur des trames binaires capteur (rendues avec leur en-tête, pour parse_message)"""
+    return FrameReader(WIRE_HEADER.size, lambda header: check_header(header, max_size),
+                       include_header=True, max_size=max_size)
+
+
+def iter_messages(sock, max_size=MAX_MESSAGE_SIZE):
+    """Messages successifs d'une connexion capteur : plusieurs trames binaires à la suite,
+    ou un seul message JSON lu jusqu'à la fermeture. ValueError si le flux est désynchronisé."""
+    frames = message_reader(max_size)
+    if not frames.recv_from(sock):
+        return
+    if frames.buffer[:1] == WIRE_MAGIC[:1]:
+        yield from frames.frames(sock)
+        return
+
+    data = bytearray(frames.buffer[:frames.end])
+    while len(data) <= max_size:
+        chunk = sock.recv(65536)
+        if not chunk:
+            yield bytes(data)
+            return
+        data += chunk
+    raise ValueError(f"Message too large: more than {max_size} bytes")
+
+
+async def iter_messages_async(reader, max_size=MAX_MESSAGE_SIZE):
+    """Comme iter_messages, pour un asyncio.StreamReader"""
+    chunk = await reader.read(65536)
+    if not chunk:
+        return
+    if chunk[:1] != WIRE_MAGIC[:1]:
+        data = bytearray(chunk)
+        while len(data) <= max_size:
+            chunk = await reader.read(65536)
+            if not chunk:
+                yield bytes(data)
+                return
+            data += chunk
+        raise ValueError(f"Message too large: more than {max_size} bytes")
+
+    frames = message_reader(max_size)
+    while chunk:
+        frames.feed(chunk)
+        frame = frames.next_frame()
+        while frame is not None:
+            yield frame
+            frame = frames.next_frame()
+        chunk = await reader.read(65536)
+    if frames.pending():
+        raise ValueError(f"Connection closed inside a message ({frames.pending()} bytes pending)")